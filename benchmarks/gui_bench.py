@@ -0,0 +1,322 @@
+"""
+	Headless benchmarks for pygame.gui.
+
+	Builds a synthetic window tree and times building it, laying it
+	out, drawing it and dispatching events to it, printing the results
+	as JSON so that runs can be compared by other tools. Runs under the
+	SDL dummy video driver so no display is needed.
+
+		python benchmarks/gui_bench.py --width 4 --depth 3 --output results.json
+
+	Times are in seconds. Allocations are counted as the number of
+	objects tracked by the garbage collector which are still alive
+	after each iteration; where tracemalloc is available the peak
+	number of bytes allocated during each benchmark is reported too.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import platform
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+import pygame
+import pygame.gui.window
+import pygame.gui.label
+import pygame.gui.button
+import pygame.gui.entry
+
+if sys.platform == "win32":
+	timer = time.clock
+else:
+	timer = time.time
+
+WORDS = [u"lorem", u"ipsum", u"dolor", u"sit", u"amet", u"consectetur",
+			u"adipiscing", u"elit", u"sed", u"do", u"eiusmod", u"tempor"]
+
+def _text(rng):
+	return u" ".join(rng.choice(WORDS) for _ in xrange(rng.randint(1, 3)))
+
+def _label(parent, rng):
+	return pygame.gui.label.Label(parent, text=_text(rng))
+
+def _button(parent, rng):
+	return pygame.gui.button.Button(parent, text=_text(rng))
+
+def _entry(parent, rng):
+	entry = pygame.gui.entry.Entry(parent, width=rng.randint(40, 120))
+	entry.buffer = _text(rng)
+	return entry
+
+def _surface(parent, rng):
+	surface = pygame.Surface((rng.randint(8, 64), rng.randint(8, 64)))
+	surface.fill((rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+	return pygame.gui.window.SurfaceWindow(parent, surface,
+				width=rng.randint(8, 64), height=rng.randint(8, 64))
+
+WIDGETS = {
+	"label": _label,
+	"button": _button,
+	"entry": _entry,
+	"surface": _surface,
+	}
+
+def build_tree(root, width, depth, mix, rng):
+	"""
+		Fills root with a tree of windows. Every container holds width
+		children, laid out in a grid, and containers are nested depth
+		levels deep. The children of the deepest containers are widgets
+		picked at random from the kinds named in mix.
+
+		Returns a dictionary of the windows created, keyed by kind.
+	"""
+	windows = {kind: [] for kind in mix}
+	windows["container"] = []
+
+	columns = max(1, int(round(width ** 0.5)))
+	rows = (width + columns - 1) // columns
+
+	def fill(parent, level):
+		for index in xrange(width):
+			x = float(index % columns) / columns
+			y = float(index // columns) / rows
+
+			if level < depth:
+				window = pygame.gui.window.Window(parent,
+							width=1.0 / columns, height=1.0 / rows,
+							x=x, y=y, border_width=1)
+				windows["container"].append(window)
+				fill(window, level + 1)
+			else:
+				kind = rng.choice(mix)
+				window = WIDGETS[kind](parent, rng)
+				window.x = x
+				window.y = y
+				windows[kind].append(window)
+
+	fill(root, 1)
+	return windows
+
+def generate_events(count, size, rng):
+	"""
+		Returns a list of count synthetic events over a screen of the
+		given size: mostly mouse motion, with clicks and key presses
+		mixed in.
+	"""
+	events = []
+	pos = (size[0] // 2, size[1] // 2)
+
+	while len(events) < count:
+		choice = rng.random()
+
+		if choice < 0.8:
+			pos = (min(size[0] - 1, max(0, pos[0] + rng.randint(-20, 20))),
+					min(size[1] - 1, max(0, pos[1] + rng.randint(-20, 20))))
+			events.append(pygame.event.Event(pygame.MOUSEMOTION,
+							pos=pos, rel=(0, 0), buttons=(0, 0, 0)))
+		elif choice < 0.9:
+			events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+			events.append(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1))
+		else:
+			key = rng.choice([pygame.K_a, pygame.K_b, pygame.K_c, pygame.K_BACKSPACE])
+			unicode = u"" if key == pygame.K_BACKSPACE else unichr(key)
+			events.append(pygame.event.Event(pygame.KEYDOWN,
+							key=key, mod=0, unicode=unicode))
+			events.append(pygame.event.Event(pygame.KEYUP, key=key, mod=0))
+
+	return events[:count]
+
+def peak_rss():
+	""" Peak resident set size of the process in kilobytes, or None """
+
+	if resource is None:
+		return None
+
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin":
+		peak //= 1024 # Reported in bytes rather than kilobytes
+	return peak
+
+def measure(function, iterations, operations=1, setup=None):
+	"""
+		Calls function iterations times, calling setup beforehand each
+		time if given, and returns statistics about the calls. Each call
+		is taken to perform the given number of operations, such as
+		events dispatched, which per_operation timings are divided by.
+	"""
+	times = []
+	allocations = []
+
+	if tracemalloc is not None:
+		tracemalloc.start()
+
+	for _ in xrange(iterations):
+		if setup is not None:
+			setup()
+
+		gc.collect()
+		objects = len(gc.get_objects())
+
+		start = timer()
+		function()
+		times.append(timer() - start)
+
+		allocations.append(len(gc.get_objects()) - objects)
+
+	allocated_peak = None
+	if tracemalloc is not None:
+		allocated_peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+
+	ordered = sorted(times)
+	total = sum(times)
+
+	return {
+		"iterations": iterations,
+		"operations": operations,
+		"total": total,
+		"min": ordered[0],
+		"max": ordered[-1],
+		"mean": total / iterations,
+		"median": ordered[len(ordered) // 2],
+		"per_operation": total / (iterations * operations),
+		"allocations": sum(allocations) / float(iterations),
+		"allocated_peak": allocated_peak,
+		"peak_rss": peak_rss(),
+		}
+
+def run(args):
+	pygame.init()
+	pygame.display.set_mode(tuple(args.size))
+	rng = random.Random(args.seed)
+
+	results = {
+		"parameters": vars(args),
+		"environment": {
+			"python": platform.python_version(),
+			"implementation": platform.python_implementation(),
+			"platform": platform.platform(),
+			"pygame": pygame.version.ver,
+			"video_driver": pygame.display.get_driver(),
+			},
+		"benchmarks": {},
+		}
+	benchmarks = results["benchmarks"]
+
+	# Building
+	state = {}
+
+	def build():
+		state["root"] = pygame.gui.window.RootWindow()
+		state["windows"] = build_tree(state["root"],
+						args.width, args.depth, args.mix, random.Random(args.seed))
+
+	benchmarks["build"] = measure(build, args.builds)
+
+	root = state["root"]
+	windows = state["windows"]
+	everything = root.decendants
+	results["tree"] = {kind: len(created) for kind, created in windows.iteritems()}
+	results["tree"]["total"] = len(everything)
+	benchmarks["build"]["per_window"] = benchmarks["build"]["mean"] / len(everything)
+
+	# Layout, from scratch
+	def layout():
+		for window in everything:
+			window.rect
+
+	def invalidate():
+		root.padding = root.padding
+
+	benchmarks["layout"] = measure(layout, args.frames, len(everything), invalidate)
+
+	# Drawing
+	def full_redraw():
+		root.dirty_rects = False
+		for window in everything:
+			window.redraw = True
+
+	benchmarks["draw_full"] = measure(root.draw, args.frames, setup=full_redraw)
+
+	root.dirty_rects = True
+	root.draw()
+	benchmarks["draw_idle"] = measure(root.draw, args.frames)
+
+	labels = windows.get("label") or everything
+
+	def change_one():
+		window = rng.choice(labels)
+		if isinstance(window, pygame.gui.label.Label):
+			window.text = _text(rng)
+		else:
+			window.redraw = True
+
+	benchmarks["draw_dirty"] = measure(root.draw, args.frames, setup=change_one)
+
+	# Event dispatch
+	events = generate_events(args.events, tuple(args.size), rng)
+	chunk = max(1, args.events // args.frames)
+	chunks = [events[i:i + chunk] for i in xrange(0, len(events), chunk)]
+	remaining = list(chunks)
+
+	def dispatch():
+		root.process_events(remaining.pop(0))
+
+	benchmarks["events"] = measure(dispatch, len(chunks), chunk)
+
+	return results
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--width", type=int, default=4,
+						help="children per container (default: %(default)s)")
+	parser.add_argument("--depth", type=int, default=3,
+						help="levels of nesting (default: %(default)s)")
+	parser.add_argument("--mix", type=lambda mix: mix.split(","),
+						default=sorted(WIDGETS.keys()),
+						help="comma separated widget kinds to build from: {}".format(
+								", ".join(sorted(WIDGETS.keys()))))
+	parser.add_argument("--size", type=int, nargs=2, default=[800, 600],
+						metavar=("WIDTH", "HEIGHT"), help="screen size")
+	parser.add_argument("--frames", type=int, default=50,
+						help="frames drawn by each drawing benchmark (default: %(default)s)")
+	parser.add_argument("--builds", type=int, default=5,
+						help="times the tree is built (default: %(default)s)")
+	parser.add_argument("--events", type=int, default=5000,
+						help="synthetic events dispatched (default: %(default)s)")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--output", "-o", help="file to write results to instead of stdout")
+	args = parser.parse_args(argv)
+
+	for kind in args.mix:
+		if kind not in WIDGETS:
+			parser.error("unknown widget kind {!r}".format(kind))
+
+	results = run(args)
+	output = json.dumps(results, indent=2, sort_keys=True)
+
+	if args.output:
+		with open(args.output, "w") as f:
+			f.write(output + "\n")
+	else:
+		print output
+
+if __name__ == "__main__":
+	main()
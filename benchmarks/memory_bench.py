@@ -0,0 +1,162 @@
+"""
+	Memory used per widget by pygame.gui.
+
+	Builds a number of each kind of widget and reports how many bytes
+	each one takes up, printing the results as JSON like gui_bench.py.
+	Runs under the SDL dummy video driver so no display is needed.
+
+		python benchmarks/memory_bench.py --count 10000 --output memory.json
+
+	Bytes are counted by walking the objects created while building
+	the widgets and adding up their sizes, so they cover everything a
+	widget owns (its instance, attribute storage, event tables, text
+	and so on) but not what it shares with other widgets. Where
+	tracemalloc is available the bytes it saw allocated are reported
+	too.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import sys
+import gc
+import json
+import argparse
+import platform
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+import pygame
+import pygame.gui.window
+import pygame.gui.label
+import pygame.gui.button
+import pygame.gui.entry
+
+WIDGETS = {
+	"window": lambda parent: pygame.gui.window.Window(parent, width=40, height=20),
+	"label": lambda parent: pygame.gui.label.Label(parent, text=u"label"),
+	"button": lambda parent: pygame.gui.button.Button(parent, text=u"button"),
+	"entry": lambda parent: pygame.gui.entry.Entry(parent, width=80),
+	}
+
+def _snapshot():
+	"""
+		Returns the objects alive now, and the ids of those and of
+		everything they refer to. The objects are returned so they are
+		kept alive, and their ids aren't reused, while the snapshot is.
+	"""
+	gc.collect()
+	objects = gc.get_objects()
+
+	seen = set(id(thing) for thing in objects)
+	for thing in objects:
+		seen.update(id(referent) for referent in gc.get_referents(thing))
+
+	return objects, seen
+
+def _new_bytes(roots, seen):
+	""" Combined size of roots and what they refer to, leaving out anything in seen """
+
+	total = 0
+	visited = set()
+	pending = list(roots)
+
+	while pending:
+		thing = pending.pop()
+		if id(thing) in seen or id(thing) in visited or isinstance(thing, type):
+			continue
+
+		visited.add(id(thing))
+		total += sys.getsizeof(thing)
+		pending.extend(gc.get_referents(thing))
+
+	return total
+
+def measure(kind, count):
+	"""
+		Builds count widgets of kind in a container of their own and
+		returns the bytes used per widget.
+	"""
+	container = pygame.gui.window.Window(None)
+	factory = WIDGETS[kind]
+
+	# Warm up caches shared between widgets
+	factory(pygame.gui.window.Window(None))
+
+	objects, seen = _snapshot()
+	if tracemalloc is not None:
+		tracemalloc.start()
+
+	widgets = [factory(container) for _ in xrange(count)]
+
+	traced = None
+	if tracemalloc is not None:
+		traced = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+
+	gc.collect()
+	new_objects = [thing for thing in gc.get_objects() if id(thing) not in seen]
+	walked = _new_bytes(widgets, seen)
+
+	result = {
+		"count": count,
+		"bytes": walked / float(count),
+		"gc_objects": len(new_objects) / float(count),
+		"instance_bytes": sys.getsizeof(widgets[0]) + sys.getsizeof(getattr(widgets[0], "__dict__", None)),
+		"traced_bytes": traced / float(count) if traced is not None else None,
+		}
+
+	del widgets, new_objects, objects
+	return result
+
+def run(args):
+	pygame.init()
+	pygame.display.set_mode((320, 240))
+
+	results = {
+		"parameters": vars(args),
+		"environment": {
+			"python": platform.python_version(),
+			"implementation": platform.python_implementation(),
+			"platform": platform.platform(),
+			"pygame": pygame.version.ver,
+			},
+		"widgets": {},
+		}
+
+	for kind in args.kinds:
+		results["widgets"][kind] = measure(kind, args.count)
+
+	return results
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--count", type=int, default=10000,
+						help="widgets built of each kind (default: %(default)s)")
+	parser.add_argument("--kinds", type=lambda kinds: kinds.split(","),
+						default=sorted(WIDGETS.keys()),
+						help="comma separated widget kinds to measure: {}".format(
+								", ".join(sorted(WIDGETS.keys()))))
+	parser.add_argument("--output", "-o", help="file to write results to instead of stdout")
+	args = parser.parse_args(argv)
+
+	for kind in args.kinds:
+		if kind not in WIDGETS:
+			parser.error("unknown widget kind {!r}".format(kind))
+
+	results = run(args)
+	output = json.dumps(results, indent=2, sort_keys=True)
+
+	if args.output:
+		with open(args.output, "w") as f:
+			f.write(output + "\n")
+	else:
+		print output
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,94 @@
+
+import collections
+
+def surface_cost(surface):
+	""" Number of bytes of pixel data held by surface, for budgeting caches of surfaces """
+	return surface.get_pitch() * surface.get_height()
+
+class LRUCache(object):
+	"""
+		Mapping that discards the least recently used entries once the
+		combined cost of its entries exceeds a budget. The cost of each
+		entry is given by the cost function, which defaults to counting
+		entries.
+		
+		Keeps count of hits, misses and evictions so the effectiveness
+		of a cache can be judged.
+	"""
+	
+	def __init__(self, budget, cost=None):
+		self._budget = budget
+		self.cost = cost if cost is not None else lambda value: 1
+		self.size = 0 # Combined cost of all the entries
+		
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		
+		self._entries = collections.OrderedDict() # key -> (value, cost)
+	
+	def __len__(self):
+		return len(self._entries)
+	
+	def __contains__(self, key):
+		return key in self._entries
+	
+	@property
+	def budget(self):
+		return self._budget
+	
+	@budget.setter
+	def budget(self, budget):
+		self._budget = budget
+		self._evict()
+	
+	def get(self, key, default=None):
+		""" Returns the value for key, marking it as recently used """
+		
+		try:
+			entry = self._entries.pop(key)
+		except KeyError:
+			self.misses += 1
+			return default
+		
+		self._entries[key] = entry
+		self.hits += 1
+		return entry[0]
+	
+	def put(self, key, value):
+		""" Adds value to the cache, evicting old entries if needed """
+		
+		if key in self._entries:
+			self.size -= self._entries.pop(key)[1]
+		
+		cost = self.cost(value)
+		if cost > self._budget:
+			return
+		
+		self._entries[key] = (value, cost)
+		self.size += cost
+		self._evict()
+	
+	def keys(self):
+		""" Returns the keys, least recently used first """
+		return self._entries.keys()
+	
+	def discard(self, key):
+		""" Removes key from the cache if it is present """
+		
+		if key in self._entries:
+			self.size -= self._entries.pop(key)[1]
+	
+	def clear(self):
+		self._entries.clear()
+		self.size = 0
+	
+	def reset_stats(self):
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+	
+	def _evict(self):
+		while self.size > self._budget:
+			self.size -= self._entries.popitem(last=False)[1][1]
+			self.evictions += 1
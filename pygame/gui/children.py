@@ -0,0 +1,175 @@
+
+_set = object.__setattr__
+
+class ChildList(object):
+	"""
+		The children of a window, bottom-most first. Children with a
+		higher z_index are stacked above those with a lower one and,
+		within a z-index, in the order they were added, lifted or
+		lowered.
+		
+		The children are linked to one another through their _below
+		and _above attributes, so adding, removing and restacking a
+		child take constant time however many siblings it has, besides
+		a scan of the distinct z-indices in use. Indexing and
+		iterating use a list of the children made when first needed
+		after the stacking changes.
+	"""
+	
+	__slots__ = ("_bottom", "_top", "_levels", "_len", "_list")
+	
+	def __init__(self):
+		self._bottom = None
+		self._top = None
+		self._levels = [] # [z-index, bottom-most, top-most child with it], lowest first
+		self._len = 0
+		self._list = None
+	
+	def __len__(self):
+		return self._len
+	
+	def __nonzero__(self):
+		return self._len != 0
+	
+	def __contains__(self, window):
+		return window._siblings is self
+	
+	def _as_list(self):
+		if self._list is None:
+			windows = []
+			window = self._bottom
+			while window is not None:
+				windows.append(window)
+				window = window._above
+			self._list = windows
+		return self._list
+	
+	def __iter__(self):
+		return iter(self._as_list())
+	
+	def __reversed__(self):
+		return reversed(self._as_list())
+	
+	def __getitem__(self, index):
+		if index == -1 and self._top is not None:
+			return self._top
+		return self._as_list()[index]
+	
+	def __repr__(self):
+		return "ChildList({!r})".format(self._as_list())
+	
+	def index(self, window):
+		if window._siblings is not self:
+			raise ValueError("{!r} is not a child".format(window))
+		return self._as_list().index(window)
+	
+	@property
+	def top(self):
+		""" The top-most child, or None """
+		return self._top
+	
+	@property
+	def bottom(self):
+		""" The bottom-most child, or None """
+		return self._bottom
+	
+	def _link(self, window, below, above):
+		_set(window, "_below", below)
+		_set(window, "_above", above)
+		if below is None:
+			self._bottom = window
+		else:
+			_set(below, "_above", window)
+		if above is None:
+			self._top = window
+		else:
+			_set(above, "_below", window)
+	
+	def _level(self, z_index):
+		""" Returns the index of the level for z_index, or of the level above where it belongs """
+		
+		levels = self._levels
+		index = 0
+		while index < len(levels) and levels[index][0] < z_index:
+			index += 1
+		return index
+	
+	def _insert(self, window, on_top):
+		z_index = window._z_index
+		levels = self._levels
+		index = self._level(z_index)
+		
+		if index < len(levels) and levels[index][0] == z_index:
+			level = levels[index]
+			if on_top:
+				below = level[2]
+				above = below._above
+				level[2] = window
+			else:
+				above = level[1]
+				below = above._below
+				level[1] = window
+		else:
+			# Goes below the bottom of the next level up, if any
+			if index < len(levels):
+				above = levels[index][1]
+				below = above._below
+			else:
+				below = self._top
+				above = None
+			levels.insert(index, [z_index, window, window])
+		
+		self._link(window, below, above)
+		_set(window, "_siblings", self)
+		self._len += 1
+		self._list = None
+	
+	def append(self, window):
+		""" Adds window on top of the children with the same z_index """
+		
+		if window._siblings is not None:
+			raise ValueError("{!r} is already a child".format(window))
+		self._insert(window, True)
+	
+	def remove(self, window):
+		if window._siblings is not self:
+			raise ValueError("{!r} is not a child".format(window))
+		
+		below = window._below
+		above = window._above
+		index = self._level(window._z_index)
+		level = self._levels[index]
+		
+		if level[1] is window and level[2] is window:
+			del self._levels[index]
+		elif level[1] is window:
+			level[1] = above
+		elif level[2] is window:
+			level[2] = below
+		
+		if below is None:
+			self._bottom = above
+		else:
+			_set(below, "_above", above)
+		if above is None:
+			self._top = below
+		else:
+			_set(above, "_below", below)
+		
+		_set(window, "_below", None)
+		_set(window, "_above", None)
+		_set(window, "_siblings", None)
+		self._len -= 1
+		self._list = None
+	
+	def lift(self, window):
+		""" Moves window above the other children with the same z_index """
+		
+		self.remove(window)
+		self._insert(window, True)
+	
+	def lower(self, window):
+		""" Moves window below the other children with the same z_index """
+		
+		self.remove(window)
+		self._insert(window, False)
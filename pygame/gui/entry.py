@@ -1,45 +1,210 @@
-
 import pygame
 import pygame.gui.window
+import pygame.gui.text
+import pygame.gui.gapbuffer
+import pygame.gui.style
 
 class Entry(pygame.gui.window.Window):
+	"""
+		Single line text entry with a caret and selection. The text is
+		held in a GapBuffer that keeps the advances of its characters,
+		so the caret is placed and kept in view without measuring the
+		whole text, and only the part of the text that is in view is
+		rendered.
+	"""
 	
 	default_padding = 2
 	default_background = (0xff, 0xff, 0xff)
 	default_border_width = 1
 	default_border_style = pygame.gui.window.Window.BORDER_STYLE_INSET
+	default_caret_colour = (0, 0, 0)
+	default_selection_colour = (0xad, 0xd6, 0xff)
+	default_max_length = -1
+	
+	__slots__ = ("max_length", "_text", "_measured_style", "caret", "anchor", "scroll", "focused")
+	
+	_style_attrs = dict(pygame.gui.window.Window._style_attrs,
+				caret_colour="caret_colour", selection_colour="selection_colour")
+	_default_attrs = dict(pygame.gui.window.Window._default_attrs, max_length="max_length")
+	
+	caret_colour = pygame.gui.style.attribute("caret_colour")
+	selection_colour = pygame.gui.style.attribute("selection_colour")
 	
 	def __init__(self, parent, **kwargs):
 		pygame.gui.window.Window.__init__(self, parent, **kwargs)
 		
-		self.height = self.font.get_height()
-		self.max_length = kwargs.get("max_length", -1)
-		self.buffer = u""
+		self.height = pygame.gui.text.get_height(self.font_style)
+		
+		self._measured_style = self.font_style
+		self._text = pygame.gui.gapbuffer.GapBuffer(measure=self._measure)
+		self.caret = 0
+		self.anchor = None # Other end of the selection from the caret, if any
+		self.scroll = 0 # Offset of the text, in pixels, at the left edge
+		self.focused = False
 		
-		self.bind(Entry.CLICK, lambda: self.focus())
+		self.bind(Entry.CLICK, self.focus)
+		self.bind(Entry.MOUSEDOWN, self._on_mousedown)
 		self.bind(Entry.FOCUS, self._on_focus)
 		self.bind(Entry.BLUR, self._on_blur)
 		self.bind(Entry.KEYDOWN, self._on_keydown)
 	
-	def _on_focus(self): pass
-	def _on_blur(self): pass
+	def _measure(self, char):
+		return pygame.gui.text.advance(self.font_style, char)
+	
+	@property
+	def buffer(self):
+		""" The entry's text """
+		return self._text.text
+	
+	@buffer.setter
+	def buffer(self, text):
+		self._text.delete(0, len(self._text))
+		self._text.insert(0, text)
+		self.caret = len(self._text)
+		self.anchor = None
+	
+	@property
+	def selection(self):
+		""" (start, end) of the selected text, or None """
+		
+		if self.anchor is None or self.anchor == self.caret:
+			return None
+		return min(self.anchor, self.caret), max(self.anchor, self.caret)
+	
+	@property
+	def selected_text(self):
+		selection = self.selection
+		if selection is None:
+			return u""
+		return self._text.slice(*selection)
+	
+	def select(self, start, end):
+		""" Selects the text between start and end, leaving the caret at end """
+		
+		self.anchor = max(0, min(start, len(self._text)))
+		self.caret = max(0, min(end, len(self._text)))
+	
+	def insert(self, text):
+		""" Inserts text at the caret, replacing the selection """
+		
+		self.delete_selection()
+		if self.max_length >= 0:
+			text = text[:max(0, self.max_length - len(self._text))]
+		
+		self._text.insert(self.caret, text)
+		self.caret += len(text)
+	
+	def delete_selection(self):
+		selection = self.selection
+		if selection is not None:
+			self._text.delete(*selection)
+			self.caret = selection[0]
+		self.anchor = None
+	
+	def move_caret(self, position, extend=False):
+		""" Moves the caret, extending the selection to it if extend is set """
+		
+		if extend:
+			if self.anchor is None:
+				self.anchor = self.caret
+		else:
+			self.anchor = None
+		self.caret = max(0, min(position, len(self._text)))
+	
+	def caret_at(self, x):
+		""" Position the caret would be placed at for a point x pixels into the content area """
+		return self._text.caret_at(x + self.scroll)
+	
+	def _on_focus(self):
+		self.focused = True
+	
+	def _on_blur(self):
+		self.focused = False
+	
+	def _on_mousedown(self):
+		x, y = pygame.mouse.get_pos()
+		content_rect = self._screen_rect(self.content_rect)
+		if content_rect.collidepoint(x, y):
+			self.move_caret(self.caret_at(x - content_rect.x))
 	
 	def _on_keydown(self, unicode, key, mod):
-			
+		extend = bool(mod & pygame.KMOD_SHIFT)
+		
 		if key == pygame.K_BACKSPACE:
-			self.buffer = self.buffer[:-1]
-		else:
-			if len(self.buffer) < self.max_length or self.max_length < 0:
-				self.buffer += unicode
+			if self.selection is None:
+				self.move_caret(self.caret - 1, True)
+			self.delete_selection()
+		elif key == pygame.K_DELETE:
+			if self.selection is None:
+				self.move_caret(self.caret + 1, True)
+			self.delete_selection()
+		elif key == pygame.K_LEFT:
+			self.move_caret(self.caret - 1, extend)
+		elif key == pygame.K_RIGHT:
+			self.move_caret(self.caret + 1, extend)
+		elif key == pygame.K_HOME:
+			self.move_caret(0, extend)
+		elif key == pygame.K_END:
+			self.move_caret(len(self._text), extend)
+		elif key == pygame.K_a and mod & pygame.KMOD_CTRL:
+			self.select(0, len(self._text))
+		elif unicode and unicode >= u" " and unicode != u"\x7f":
+			self.insert(unicode)
+	
+	def _scroll_to_caret(self, width):
+		caret_x = self._text.offset(self.caret)
+		scroll = min(self.scroll, max(0, self._text.width - width + 1))
+		
+		if caret_x < scroll:
+			scroll = caret_x
+		elif caret_x >= scroll + width:
+			scroll = caret_x - width + 1
+		
+		if scroll != self.scroll:
+			self.scroll = scroll
 	
 	def draw(self):
-		text = self.font.render(self.buffer, self.font_aa, self.font_colour, self.background)
-		text_rect = text.get_rect()
-		self.surface = text
-		
-		if text_rect.width > self.content_rect.width:
-			self.surface_area = pygame.Rect(
-							(text_rect.width - self.content_rect.width, 0),
-							self.content_rect.size)
+		width, height = self.content_rect.size
+		if width <= 0 or height <= 0:
+			return
+		
+		if self.font_style != self._measured_style:
+			self._text.remeasure(self._measure)
+			self._measured_style = self.font_style
+		
+		self._scroll_to_caret(width)
+		text = self._text
+		scroll = self.scroll
+		
+		if self.surface is None or self.surface.get_size() != (width, height):
+			self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+		self.surface_area = None
+		surface = self.surface
+		
+		if self.background is not None:
+			surface.fill(self.background)
 		else:
-			self.surface_area = None
+			surface.fill((0, 0, 0, 0))
+		
+		selection = self.selection
+		if selection is not None:
+			left = text.offset(selection[0]) - scroll
+			right = text.offset(selection[1]) - scroll
+			# Clipped as fill() treats a negative left, where the start
+			# of the selection is scrolled out of view, as zero
+			surface.fill(self.selection_colour,
+							pygame.Rect(left, 0, right - left, height).clip(surface.get_rect()))
+		
+		# Only the characters at least partly in view are rendered
+		start = text.position_at(scroll)
+		end = min(len(text), text.position_at(scroll + width) + 1)
+		visible = text.slice(start, end)
+		if visible:
+			rendered = pygame.gui.text.render(self.font_style,
+							visible, self.font_aa, self.font_colour)
+			surface.blit(rendered, (text.offset(start) - scroll, 0))
+		
+		if self.focused:
+			caret_x = text.offset(self.caret) - scroll
+			surface.fill(self.caret_colour,
+							pygame.Rect(caret_x, 0, 1, height).clip(surface.get_rect()))
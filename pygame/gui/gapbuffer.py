@@ -0,0 +1,196 @@
+
+class GapBuffer(object):
+	"""
+		Editable sequence of characters. The characters are kept in a
+		list with a gap at the last place edited, so typing only fills
+		the gap and edits close together only move the characters
+		between them.
+		
+		When given a measure function, returning the advance of a
+		character, the widths of the characters are kept in a Fenwick
+		tree laid over the same list, with the gap counting as zero
+		width. The offset of a position, and the position at an offset,
+		are then found in O(log n).
+	"""
+	
+	__slots__ = ("_measure", "_chars", "_gap_start", "_gap_end", "_widths", "_tree")
+	
+	def __init__(self, text=u"", measure=None):
+		self._measure = measure if measure is not None else lambda char: 0
+		self._allocate([], [], 2 * len(text)) # Grows on first insert
+		self.insert(0, text)
+	
+	def _allocate(self, before, after, capacity):
+		""" Lays out the characters around a gap so there are capacity slots in all """
+		
+		gap = capacity - len(before) - len(after)
+		self._chars = before + [None] * gap + after
+		self._gap_start = len(before)
+		self._gap_end = len(before) + gap
+		
+		self._widths = [0] * capacity
+		for index in xrange(capacity):
+			if self._chars[index] is not None:
+				self._widths[index] = self._measure(self._chars[index])
+		
+		# Fenwick tree in linear time
+		self._tree = [0] + self._widths
+		for index in xrange(1, capacity + 1):
+			parent = index + (index & -index)
+			if parent <= capacity:
+				self._tree[parent] += self._tree[index]
+	
+	def __len__(self):
+		return len(self._chars) - (self._gap_end - self._gap_start)
+	
+	def __unicode__(self):
+		return self.slice(0, len(self))
+	
+	@property
+	def text(self):
+		return self.slice(0, len(self))
+	
+	def _physical(self, position):
+		""" Index into the list of the slot at a position in the text """
+		
+		if position < self._gap_start:
+			return position
+		return position + (self._gap_end - self._gap_start)
+	
+	def _set_width(self, index, width):
+		delta = width - self._widths[index]
+		if delta:
+			self._widths[index] = width
+			index += 1
+			while index < len(self._tree):
+				self._tree[index] += delta
+				index += index & -index
+	
+	def slice(self, start, end):
+		""" Text between two positions """
+		
+		start = max(0, start)
+		end = min(len(self), end)
+		if start >= end:
+			return u""
+		
+		gap_start, gap_end = self._gap_start, self._gap_end
+		if end <= gap_start:
+			return u"".join(self._chars[start:end])
+		if start >= gap_start:
+			return u"".join(self._chars[self._physical(start):self._physical(end)])
+		return u"".join(self._chars[start:gap_start] + self._chars[gap_end:self._physical(end)])
+	
+	def _move_gap(self, position):
+		chars = self._chars
+		
+		if self._gap_start == self._gap_end:
+			self._gap_start = self._gap_end = position
+			return
+		
+		while self._gap_start > position:
+			self._gap_start -= 1
+			self._gap_end -= 1
+			chars[self._gap_end] = chars[self._gap_start]
+			chars[self._gap_start] = None
+			self._set_width(self._gap_end, self._widths[self._gap_start])
+			self._set_width(self._gap_start, 0)
+		
+		while self._gap_start < position:
+			chars[self._gap_start] = chars[self._gap_end]
+			chars[self._gap_end] = None
+			self._set_width(self._gap_start, self._widths[self._gap_end])
+			self._set_width(self._gap_end, 0)
+			self._gap_start += 1
+			self._gap_end += 1
+	
+	def insert(self, position, text):
+		if not text:
+			return
+		
+		if len(text) > self._gap_end - self._gap_start:
+			chars = list(self.slice(0, len(self)))
+			capacity = max(2 * len(self._chars), len(chars) + 2 * len(text))
+			self._allocate(chars[:position], chars[position:], capacity)
+		else:
+			self._move_gap(position)
+		
+		for char in text:
+			self._chars[self._gap_start] = char
+			self._set_width(self._gap_start, self._measure(char))
+			self._gap_start += 1
+	
+	def delete(self, start, end):
+		""" Removes the text between two positions """
+		
+		start = max(0, start)
+		end = min(len(self), end)
+		if start >= end:
+			return
+		
+		self._move_gap(start)
+		for index in xrange(self._gap_end, self._gap_end + (end - start)):
+			self._chars[index] = None
+			self._set_width(index, 0)
+		self._gap_end += end - start
+	
+	def remeasure(self, measure):
+		""" Replaces the measure function, such as after a change of font """
+		
+		self._measure = measure
+		self._allocate(self._chars[:self._gap_start], self._chars[self._gap_end:], len(self._chars))
+	
+	def offset(self, position):
+		""" Combined width of the characters before position """
+		
+		index = self._physical(min(max(0, position), len(self)))
+		total = 0
+		while index > 0:
+			total += self._tree[index]
+			index -= index & -index
+		return total
+	
+	@property
+	def width(self):
+		return self.offset(len(self))
+	
+	def width_of(self, position):
+		""" Width of the character at position """
+		return self._widths[self._physical(position)]
+	
+	def position_at(self, x):
+		"""
+			Returns the position of the character at offset x, that is
+			the last position whose offset is no greater than x.
+		"""
+		tree = self._tree
+		index = 0
+		remaining = x
+		step = 1
+		while step * 2 < len(tree):
+			step *= 2
+		
+		# Descend the tree for the most slots whose widths fit within x
+		while step:
+			if index + step < len(tree) and tree[index + step] <= remaining:
+				index += step
+				remaining -= tree[index]
+			step //= 2
+		
+		if index <= self._gap_start:
+			position = index
+		elif index <= self._gap_end:
+			position = self._gap_start
+		else:
+			position = index - (self._gap_end - self._gap_start)
+		
+		# Zero width characters and the end of the text
+		return min(position, len(self))
+	
+	def caret_at(self, x):
+		""" Returns the position nearest to offset x, for placing a caret """
+		
+		position = self.position_at(x)
+		if position < len(self) and x - self.offset(position) > self.width_of(position) / 2.0:
+			position += 1
+		return position
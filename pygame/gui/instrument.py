@@ -0,0 +1,223 @@
+
+import sys
+import time
+import weakref
+import collections
+
+import pygame
+import pygame.gui.text
+
+# Categories time is recorded under
+DRAW = "draw" # Window.draw()
+BACKGROUND = "background"
+BORDER = "border"
+BLIT = "blit" # Copying window surfaces to the screen
+LAYOUT = "layout" # Calculating geometry
+TRIGGER = "trigger" # Event callbacks
+
+CATEGORIES = (DRAW, BACKGROUND, BORDER, BLIT, LAYOUT, TRIGGER)
+
+if sys.platform == "win32":
+	default_clock = time.clock
+else:
+	default_clock = time.time
+
+def describe(thing):
+	""" Short human readable name for a window or callback """
+	
+	if hasattr(thing, "func"): # functools.partial
+		thing = thing.func
+	if hasattr(thing, "im_func"):
+		owner = thing.im_self if thing.im_self is not None else thing.im_class
+		if not isinstance(owner, type):
+			owner = owner.__class__
+		return "{}.{}".format(owner.__name__, thing.im_func.__name__)
+	if hasattr(thing, "__name__"):
+		return thing.__name__
+	return "{}@{:x}".format(thing.__class__.__name__, id(thing))
+
+class FrameStats(object):
+	"""
+		Time spent during a single frame. Times are exclusive, so time
+		spent in a nested call, such as a callback triggered by a
+		window's draw(), is only counted against the innermost call.
+	"""
+	
+	def __init__(self):
+		self.totals = dict.fromkeys(CATEGORIES, 0.0) # category -> seconds
+		self.calls = dict.fromkeys(CATEGORIES, 0) # category -> count
+		self.windows = weakref.WeakKeyDictionary() # window -> {category: seconds}
+		self.callbacks = collections.defaultdict(float) # callback name -> seconds
+		self.draw_time = 0.0 # Spent in RootWindow.draw()
+		self.frame_time = 0.0 # Since the previous frame ended
+		self.paint_counts = None # RootWindow.paint_counts for the frame
+	
+	def add(self, category, window, elapsed):
+		self.totals[category] += elapsed
+		self.calls[category] += 1
+		
+		times = self.windows.get(window)
+		if times is None:
+			times = self.windows[window] = collections.defaultdict(float)
+		times[category] += elapsed
+	
+	def window_time(self, window, category=None):
+		""" Time spent on window, in category or in total """
+		
+		times = self.windows.get(window, {})
+		if category is None:
+			return sum(times.itervalues())
+		return times.get(category, 0.0)
+
+class Profiler(object):
+	"""
+		Records where each frame's time goes. Assign one to a
+		RootWindow's profiler attribute to start recording; frames end
+		each time the root is drawn. The most recent frames are kept in
+		frames, oldest first.
+		
+		If overlay is set the slowest windows of the last frame are
+		listed in the corner of the screen.
+	"""
+	
+	overlay_style = (None, 14, False, False, False)
+	overlay_colour = (255, 255, 255)
+	overlay_background = (0, 0, 0)
+	
+	def __init__(self, history=60, overlay=False, clock=default_clock):
+		self.frames = collections.deque(maxlen=history)
+		self.current = FrameStats()
+		self.overlay = overlay
+		self.clock = clock
+		
+		self._stack = [] # Time spent in nested calls, per active call
+		self._frame_started = clock()
+	
+	@property
+	def last(self):
+		""" Stats for the most recently completed frame, or None """
+		return self.frames[-1] if self.frames else None
+	
+	def call(self, category, window, function, *args):
+		""" Calls function, recording the time it takes against window """
+		
+		result, elapsed = self._timed(function, args)
+		self.current.add(category, window, elapsed)
+		return result
+	
+	def trigger(self, window, handlers, args):
+		""" Calls event handlers, timing each one """
+		
+		for handler in handlers:
+			elapsed = self._timed(handler, args)[1]
+			self.current.add(TRIGGER, window, elapsed)
+			self.current.callbacks[describe(handler)] += elapsed
+	
+	def _timed(self, function, args):
+		stack = self._stack
+		stack.append(0.0)
+		start = self.clock()
+		try:
+			result = function(*args)
+		finally:
+			elapsed = self.clock() - start
+			nested = stack.pop()
+			if stack:
+				stack[-1] += elapsed
+		
+		return result, elapsed - nested
+	
+	def end_frame(self, draw_time=0.0):
+		now = self.clock()
+		
+		frame = self.current
+		frame.draw_time = draw_time
+		frame.frame_time = now - self._frame_started
+		
+		self.frames.append(frame)
+		self.current = FrameStats()
+		self._frame_started = now
+		return frame
+	
+	def reset(self):
+		self.frames.clear()
+		self.current = FrameStats()
+	
+	def slowest(self, category=None, count=10):
+		"""
+			Returns (window, seconds) pairs for the windows that took
+			longest on average over the recorded frames, in category or
+			in total, slowest first.
+		"""
+		totals = collections.defaultdict(float)
+		for frame in self.frames:
+			for window in frame.windows.keys():
+				totals[window] += frame.window_time(window, category)
+		
+		frames = len(self.frames) or 1
+		ranked = sorted(totals.iteritems(), key=lambda item: item[1], reverse=True)
+		return [(window, seconds / frames) for window, seconds in ranked[:count]]
+	
+	def slowest_callbacks(self, count=10):
+		""" Returns (name, seconds) pairs for the slowest callbacks on average, slowest first """
+		
+		totals = collections.defaultdict(float)
+		for frame in self.frames:
+			for name, seconds in frame.callbacks.iteritems():
+				totals[name] += seconds
+		
+		frames = len(self.frames) or 1
+		ranked = sorted(totals.iteritems(), key=lambda item: item[1], reverse=True)
+		return [(name, seconds / frames) for name, seconds in ranked[:count]]
+	
+	def summary(self):
+		""" Average seconds per frame spent in each category, in drawing and frames overall, and windows drawn and culled """
+		
+		frames = len(self.frames) or 1
+		averages = {category: sum(frame.totals[category] for frame in self.frames) / frames
+						for category in CATEGORIES}
+		averages["draw_time"] = sum(frame.draw_time for frame in self.frames) / frames
+		averages["frame_time"] = sum(frame.frame_time for frame in self.frames) / frames
+		
+		counted = [frame.paint_counts for frame in self.frames if frame.paint_counts is not None]
+		for index, name in enumerate(("drawn", "occluded", "offscreen")):
+			averages[name] = sum(counts[index] for counts in counted) / float(len(counted) or 1)
+		return averages
+	
+	def overlay_lines(self, count=5):
+		frame = self.last
+		if frame is None:
+			return []
+		
+		lines = ["frame {:.2f}ms draw {:.2f}ms".format(
+						frame.frame_time * 1000, frame.draw_time * 1000)]
+		if frame.paint_counts is not None:
+			lines.append("drawn {} occluded {} offscreen {}".format(*frame.paint_counts))
+		ranked = sorted(frame.windows.keys(), key=frame.window_time, reverse=True)
+		for window in ranked[:count]:
+			lines.append("{} {:.2f}ms".format(describe(window),
+							frame.window_time(window) * 1000))
+		return lines
+	
+	def draw_overlay(self, surface, position=(0, 0)):
+		""" Draws the overlay onto surface, returning the rect it covers """
+		
+		x, y = position
+		areas = []
+		
+		# The lines change every frame, so they are rendered directly
+		# rather than through the text cache, where they would only
+		# evict the renderings of the windows being profiled
+		font = pygame.gui.text.get_font(self.overlay_style)
+		colours = (self.overlay_colour,)
+		if self.overlay_background is not None:
+			colours += (self.overlay_background,)
+		
+		for line in self.overlay_lines():
+			text = font.render(unicode(line), True, *colours)
+			areas.append(surface.blit(text, (x, y)))
+			y += text.get_height()
+		
+		if not areas:
+			return pygame.Rect(position, (0, 0))
+		return areas[0].unionall(areas[1:])
@@ -1,33 +1,52 @@
 
 import pygame.gui.window
+import pygame.gui.text
+import pygame.gui.style
 
 class Label(pygame.gui.window.Window):
 	
 	default_padding = 2
+	default_bold = False
+	default_italic = False
+	default_underline = False
+	
+	__slots__ = ("text",)
+	
+	_geometry_attrs = pygame.gui.window.Window._geometry_attrs | frozenset(
+				["text", "font_name", "font_size", "bold", "italic", "underline"])
+	_style_attrs = dict(pygame.gui.window.Window._style_attrs,
+				bold="bold", italic="italic", underline="underline")
+	
+	bold = pygame.gui.style.attribute("bold")
+	italic = pygame.gui.style.attribute("italic")
+	underline = pygame.gui.style.attribute("underline")
 	
 	def __init__(self, parent, **kwargs):
 		pygame.gui.window.Window.__init__(self, parent, **kwargs)
 		
 		self.text = unicode(kwargs.get("text", ""))
-		self.bold = kwargs.get("bold", False)
-		self.italic = kwargs.get("italic", False)
-		self.underline = kwargs.get("underline", False)
 	
 	@property
-	def font(self):
-		font = pygame.gui.window.Window.font.fget(self)
-		font.set_bold(self.bold)
-		font.set_italic(self.italic)
-		font.set_underline(self.underline)
-		return font
+	def font_style(self):
+		style = self._style
+		return (style.font_name, style.font_size, style.bold, style.italic, style.underline)
 	
-	@property
-	def requested_width(self):
-		return int(self.font.size(self.text)[0] + (2 * self.padding) + (2 * self.border_width))
+	def _calculate_requested_width(self):
+		style = self._style
+		return int(pygame.gui.text.size(self.font_style, self.text)[0] + (2 * style.padding) + (2 * style.border_width))
 	
-	@property
-	def requested_height(self):
-		return int(self.font.size(self.text)[1] + (2 * self.padding) + (2 * self.border_width))
+	def _calculate_requested_height(self):
+		style = self._style
+		return int(pygame.gui.text.size(self.font_style, self.text)[1] + (2 * style.padding) + (2 * style.border_width))
 	
 	def draw(self):
-		self.surface = self.font.render(self.text, self.font_aa, self.font_colour)
+		root = self._root
+		if root is None or root.render_pool is None:
+			self.surface = pygame.gui.text.render(self.font_style,
+							self.text, self.font_aa, self.font_colour)
+			return
+		
+		surface = root.render_pool.render(self, self.font_style,
+						self.text, self.font_aa, self.font_colour)
+		if surface is not None:
+			self.surface = surface
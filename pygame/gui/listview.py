@@ -0,0 +1,226 @@
+
+import pygame
+import pygame.gui.window
+import pygame.gui.text
+
+class DataSource(object):
+	"""
+		Supplies the rows displayed by a ListView. Cells are only asked
+		for when the row they are in comes into view, so sources are
+		free to produce them on demand.
+	"""
+	
+	columns = 1
+	
+	def __len__(self):
+		""" Number of rows """
+		raise NotImplementedError
+	
+	def cell(self, row, column):
+		""" Text of the cell at row and column """
+		raise NotImplementedError
+
+class SequenceSource(DataSource):
+	""" Source for a sequence of rows, each either a string or a sequence of cells """
+	
+	def __init__(self, rows):
+		self.rows = rows
+	
+	def __len__(self):
+		return len(self.rows)
+	
+	@property
+	def columns(self):
+		if len(self.rows) == 0 or isinstance(self.rows[0], basestring):
+			return 1
+		return len(self.rows[0])
+	
+	def cell(self, row, column):
+		value = self.rows[row]
+		if isinstance(value, basestring):
+			return value
+		return value[column]
+
+class Row(pygame.gui.window.Window):
+	"""
+		Displays a single row of a ListView. Rows are recycled as the
+		view scrolls, being moved to and showing whichever row of the
+		source has come into view.
+	"""
+	
+	default_background = None
+	
+	__slots__ = ("index", "cells")
+	
+	def __init__(self, parent, **kwargs):
+		pygame.gui.window.Window.__init__(self, parent, **kwargs)
+		
+		self.index = None
+		self.cells = ()
+	
+	def show(self, index):
+		""" Recycles the row to display row index of the view's source """
+		
+		view = self.parent
+		source = view.source
+		
+		self.index = index
+		self.cells = tuple(unicode(source.cell(index, column))
+						for column in xrange(source.columns))
+		self.y = index * view.row_height
+	
+	def draw(self):
+		width, height = self.content_rect.size
+		if width <= 0 or height <= 0:
+			return
+		
+		if self.surface is None or self.surface.get_size() != (width, height):
+			self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+		self.surface.fill((0, 0, 0, 0))
+		
+		x = 0
+		for text, column_width in zip(self.cells, self.parent.column_widths()):
+			rendered = pygame.gui.text.render(self.font_style,
+							text, self.font_aa, self.font_colour)
+			self.surface.blit(rendered, (x, 0),
+							pygame.Rect(0, 0, max(0, column_width - self.parent.column_spacing), height))
+			x += column_width
+
+class ListView(pygame.gui.window.ScrollableWindow):
+	"""
+		Scrollable list, or table, of rows pulled from a DataSource.
+		Only enough Row windows to fill the viewport are kept, and they
+		are recycled as rows scroll in and out of view, so the number
+		of windows, and the cost of drawing, doesn't grow with the
+		number of rows.
+		
+		Columns are given as a list of widths, integers for pixels and
+		floats for fractions of the view's width; by default there is a
+		single column as wide as the view. Call refresh() after
+		changing the source or the data it supplies.
+	"""
+	
+	default_background = (0xff, 0xff, 0xff)
+	default_border_width = 1
+	default_border_style = pygame.gui.window.Window.BORDER_STYLE_INSET
+	default_row_padding = 1
+	default_column_spacing = 4
+	default_columns = None
+	
+	__slots__ = ("source", "columns", "row_padding", "column_spacing", "_rows", "_spare_rows")
+	
+	_default_attrs = dict(pygame.gui.window.ScrollableWindow._default_attrs,
+				columns="columns", row_padding="row_padding",
+				column_spacing="column_spacing")
+	
+	def __init__(self, parent, source=None, **kwargs):
+		object.__setattr__(self, "_rows", {}) # Source row index -> Row
+		object.__setattr__(self, "_spare_rows", [])
+		
+		pygame.gui.window.ScrollableWindow.__init__(self, parent, **kwargs)
+		
+		self.source = source if source is not None else SequenceSource([])
+		
+		self.bind(ListView.RECONFIGURE, self._update_rows)
+		self._update_rows()
+	
+	def reparent(self, new_parent):
+		# Views sized relative to their parent need their rows updated
+		# when it changes size, so follow the parent it is moved to.
+		# Window.__init__ reparents before anything has been bound.
+		if self.parent is not None:
+			try:
+				self.parent.unbind(ListView.RECONFIGURE, self._on_parent_reconfigure)
+			except ValueError:
+				pass
+		
+		pygame.gui.window.ScrollableWindow.reparent(self, new_parent)
+		
+		if self.parent is not None:
+			self.parent.bind(ListView.RECONFIGURE, self._on_parent_reconfigure)
+	
+	@property
+	def row_height(self):
+		return pygame.gui.text.get_height(self.font_style) + 2 * self.row_padding
+	
+	@property
+	def content_size(self):
+		content_rect = self.geometry.content_rect
+		return (content_rect.width,
+					max(content_rect.height, len(self.source) * self.row_height))
+	
+	def column_widths(self):
+		""" Widths of the columns in pixels """
+		
+		width = self.geometry.content_rect.width
+		if self.columns is None:
+			return [width] * self.source.columns
+		
+		return [int(round(column * width)) if isinstance(column, float) else column
+					for column in self.columns]
+	
+	def row_at(self, index):
+		""" Returns the Row displaying row index of the source, or None if it isn't in view """
+		return self._rows.get(index)
+	
+	def refresh(self):
+		""" Re-reads the rows in view after the source, or its data, changed """
+		
+		for row in self._rows.values():
+			self._spare_rows.append(row)
+		self._rows.clear()
+		
+		# Scroll back within the rows there are now
+		self.scroll_to(self.scroll_x, self.scroll_y)
+		self._update_rows()
+	
+	def _scrolled(self):
+		pygame.gui.window.ScrollableWindow._scrolled(self)
+		self._update_rows()
+	
+	def _on_parent_reconfigure(self, parent):
+		self._update_rows()
+	
+	def _update_rows(self):
+		"""
+			Makes sure there is a Row showing each of the source's rows
+			within the viewport, recycling those that have scrolled out
+			of view.
+		"""
+		content_rect = self.geometry.content_rect
+		row_height = self.row_height
+		count = len(self.source)
+		
+		first = min(count, self.scroll_y // row_height)
+		last = min(count, (self.scroll_y + content_rect.height) // row_height + 1)
+		
+		for index, row in self._rows.items():
+			if not first <= index < last:
+				del self._rows[index]
+				self._spare_rows.append(row)
+		
+		for index in xrange(first, last):
+			row = self._rows.get(index)
+			
+			if row is None:
+				if self._spare_rows:
+					row = self._spare_rows.pop()
+					if row.parent is not self:
+						row.reparent(self)
+				else:
+					row = Row(self, x=0, padding=self.row_padding,
+								font=self.font_name, font_size=self.font_size,
+								font_colour=self.font_colour, font_aa=self.font_aa)
+				
+				row.show(index)
+				self._rows[index] = row
+			
+			if row.width != content_rect.width - 2 * self.row_padding:
+				row.width = content_rect.width - 2 * self.row_padding
+			if row.height != row_height - 2 * self.row_padding:
+				row.height = row_height - 2 * self.row_padding
+		
+		# Rows which weren't needed are detached until they are
+		for row in self._spare_rows:
+			if row.parent is not None:
+				row.reparent(None)
@@ -0,0 +1,82 @@
+
+import heapq
+import itertools
+
+import pygame
+import pygame.gui.instrument
+
+class Timer(object):
+	""" A callback scheduled by a Scheduler, which can be cancelled """
+	
+	__slots__ = ("due", "interval", "callback", "cancelled")
+	
+	def __init__(self, due, interval, callback):
+		self.due = due
+		self.interval = interval # None unless repeating
+		self.callback = callback
+		self.cancelled = False
+	
+	def cancel(self):
+		self.cancelled = True
+
+class Scheduler(object):
+	"""
+		Calls callbacks once a delay has passed, either once or
+		repeatedly. Timers are kept in a heap ordered by when they are
+		next due, so finding the next one is cheap however many there
+		are.
+	"""
+	
+	def __init__(self, clock=pygame.gui.instrument.default_clock):
+		self.clock = clock
+		self._heap = [] # (due, sequence, timer)
+		self._sequence = itertools.count() # Keeps timers due together in order
+	
+	def __len__(self):
+		return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+	
+	def schedule(self, delay, callback, repeat=False):
+		"""
+			Calls callback with no arguments once delay seconds have
+			passed, and every delay seconds after that if repeat is set.
+			Returns a Timer which can be cancelled.
+		"""
+		timer = Timer(self.clock() + delay, delay if repeat else None, callback)
+		self._push(timer)
+		return timer
+	
+	def _push(self, timer):
+		heapq.heappush(self._heap, (timer.due, next(self._sequence), timer))
+	
+	def next_due(self):
+		""" When the next timer is due, in terms of clock, or None if there are none """
+		
+		heap = self._heap
+		while heap and heap[0][2].cancelled:
+			heapq.heappop(heap)
+		return heap[0][0] if heap else None
+	
+	def run_due(self):
+		""" Calls the callbacks of the timers that are due, returning how many were called """
+		
+		now = self.clock()
+		heap = self._heap
+		due = []
+		while heap and heap[0][0] <= now:
+			due.append(heapq.heappop(heap)[2])
+		
+		called = 0
+		for timer in due:
+			if timer.cancelled:
+				continue
+			
+			# Repeating timers that have fallen behind skip the calls
+			# they missed rather than running them all at once
+			if timer.interval is not None:
+				timer.due = max(timer.due + timer.interval, now)
+				self._push(timer)
+			
+			timer.callback()
+			called += 1
+		
+		return called
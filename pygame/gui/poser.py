@@ -15,27 +15,306 @@ str_id_map = {
 	"middle": MIDDLE,
 	"bottom": BOTTOM,
 	"left": LEFT,
-	"right": RIGHT,			
+	"right": RIGHT,
 	}
 
+class PoseError(ValueError):
+	""" Raised when posing a window would make the layout cyclic """
+
+def _centre_x(window, parent, others, rel):
+	return (parent.actual_width / 2) - (window.actual_width / 2)
+
+def _centre_y(window, parent, others, rel):
+	return (parent.actual_height / 2) - (window.actual_height / 2)
+
+def _above(window, parent, others, rel):
+	swin = max(others, key=lambda w: w.requested_y)
+	return swin.requested_y - window.actual_height
+
+def _below(window, parent, others, rel):
+	swin = max(others, key=lambda w: w.requested_y + w.actual_height)
+	return swin.requested_y + swin.actual_height
+
+def _right_of(window, parent, others, rel):
+	swin = max(others, key=lambda w: w.requested_x + w.actual_width)
+	return swin.requested_x + swin.actual_width
+
+def _left_of(window, parent, others, rel):
+	swin = min(others, key=lambda w: w.requested_x)
+	return swin.requested_x - window.actual_width
+
+def _align_vertical(window, parent, others, rel):
+	other = others[0]
+	
+	if rel == TOP:
+		return other.y
+	elif rel == MIDDLE:
+		return other.y - ((window.actual_height - other.actual_height) / 2)
+	elif rel == BOTTOM:
+		max_h = max(other.actual_height, window.actual_height)
+		min_h = min(other.actual_height, window.actual_height)
+		return other.y + (max_h - min_h)
+
+class Constraint(object):
+	"""
+		Positions a window along one axis ("x" or "y") relative to some
+		of its siblings, or its parent. Only weak references to the
+		windows involved are held.
+	"""
+	
+	def __init__(self, window, axis, function, others=(), rel=None, uses_parent=False):
+		self._window = weakref.ref(window)
+		self._others = [weakref.ref(other) for other in others]
+		self.axis = axis
+		self.function = function
+		self.rel = rel
+		self.uses_parent = uses_parent
+	
+	@property
+	def window(self):
+		return self._window()
+	
+	@property
+	def others(self):
+		return [ref() for ref in self._others]
+	
+	@property
+	def alive(self):
+		return self.window is not None and None not in self.others
+	
+	def watched(self, parent):
+		""" Windows whose geometry the constraint depends upon """
+		
+		windows = [self.window] + self.others
+		if self.uses_parent:
+			windows.append(parent)
+		return windows
+	
+	def solve(self, parent):
+		return self.function(self.window, parent, self.others, self.rel)
+
+class Solver(object):
+	"""
+		Solves the poses of the children of a window. Constraints are
+		ordered so that each is solved after those of the windows it
+		depends on, so when a window's geometry changes everything that
+		depends on it is repositioned in a single pass, rather than by
+		a ripple of RECONFIGURE callbacks re-triggering one another.
+		
+		Each window has at most one constraint per axis; posing it
+		again along the same axis replaces the earlier constraint.
+	"""
+	
+	# Limit on the number of extra passes needed to take account of
+	# changes made by other callbacks while solving.
+	max_passes = 100
+	
+	def __init__(self, parent):
+		self._parent = weakref.ref(parent)
+		self._constraints = {} # (weakref to window, axis) -> Constraint
+		self._dependents = {} # (weakref to window, axis) -> constraints relative to the window along axis
+		self._watchers = weakref.WeakKeyDictionary() # Window -> constraints watching it
+		self._added = 0 # Constraints added since dead ones were last cleared out
+		
+		self._solving = False
+		self._writing = None # Window being written to by the solver
+		self._pending = set() # Windows changed by others while solving
+	
+	@classmethod
+	def for_window(cls, parent):
+		""" Returns the solver for parent's children, creating it if needed """
+		
+		if parent._solver is None:
+			object.__setattr__(parent, "_solver", cls(parent))
+		return parent._solver
+	
+	def add(self, constraint):
+		"""
+			Adds constraint, replacing any on the same window and axis,
+			and positions the window accordingly. Raises PoseError,
+			leaving the existing constraints in place, if the
+			constraint would form a cycle.
+			
+			Only the constraints positioned relative to the window are
+			looked at, so posing new windows one after another takes
+			linear time overall.
+		"""
+		parent = self._parent()
+		window = constraint.window
+		axis = constraint.axis
+		key = (weakref.ref(window), axis)
+		
+		# The pose is cyclic if any window it's relative to is already
+		# positioned, however indirectly, relative to the window
+		downstream = self._downstream(key)
+		for other in constraint.others:
+			if other is not window and (weakref.ref(other), axis) in downstream:
+				raise PoseError("Posing would make the layout of {} cyclic".format(
+									parent.__class__.__name__))
+		
+		previous = self._constraints.get(key)
+		if previous is not None:
+			self._detach(previous)
+		
+		self._constraints[key] = constraint
+		for other in constraint.others:
+			if other is not window:
+				self._dependents.setdefault((weakref.ref(other), axis), []).append(constraint)
+		
+		for watched in set(constraint.watched(parent)):
+			watchers = self._watchers.get(watched)
+			if watchers is None:
+				watched.bind(pygame.gui.window.Window.RECONFIGURE, self._on_reconfigure)
+				watchers = self._watchers[watched] = []
+			watchers.append(constraint)
+		
+		# Clearing out after as many additions as there are constraints
+		# keeps its cost proportional to the number added
+		self._added += 1
+		if self._added > len(self._constraints):
+			self._clear_dead()
+		
+		self._solve_from([constraint])
+	
+	def _downstream(self, key):
+		""" Keys of the windows positioned, directly or not, relative to the window and axis of key """
+		
+		found = set([key])
+		stack = [key]
+		while stack:
+			for dependent in self._dependents.get(stack.pop(), ()):
+				if dependent.alive:
+					dependent_key = (weakref.ref(dependent.window), dependent.axis)
+					if dependent_key not in found:
+						found.add(dependent_key)
+						stack.append(dependent_key)
+		return found
+	
+	def _detach(self, constraint):
+		""" Removes constraint from the dependents and watchers it was added to """
+		
+		window = constraint.window
+		for other in constraint.others:
+			if other is not None and other is not window:
+				other_key = (weakref.ref(other), constraint.axis)
+				dependents = self._dependents.get(other_key)
+				if dependents is not None and constraint in dependents:
+					dependents.remove(constraint)
+					if not dependents:
+						del self._dependents[other_key]
+		
+		for watched in set(constraint.watched(self._parent())):
+			watchers = self._watchers.get(watched) if watched is not None else None
+			if watchers is not None and constraint in watchers:
+				watchers.remove(constraint)
+				if not watchers:
+					watched.unbind(pygame.gui.window.Window.RECONFIGURE, self._on_reconfigure)
+					del self._watchers[watched]
+	
+	def _clear_dead(self):
+		""" Drops the constraints of windows which have been collected """
+		
+		for key, constraint in self._constraints.items():
+			if not constraint.alive:
+				del self._constraints[key]
+				self._detach(constraint)
+		
+		for key in [key for key in self._dependents if key[0]() is None]:
+			del self._dependents[key]
+		
+		self._added = 0
+	
+	def _ordered(self, constraints):
+		""" Returns the set constraints ordered so each comes after those it depends on """
+		
+		blockers = dict.fromkeys(constraints, 0)
+		for constraint in constraints:
+			for other in constraint.others:
+				dependency = self._constraints.get((weakref.ref(other), constraint.axis))
+				if dependency in blockers and dependency is not constraint:
+					blockers[constraint] += 1
+		
+		order = [constraint for constraint in constraints if blockers[constraint] == 0]
+		for constraint in order:
+			key = (weakref.ref(constraint.window), constraint.axis)
+			for dependent in self._dependents.get(key, ()):
+				if dependent in blockers:
+					blockers[dependent] -= 1
+					if blockers[dependent] == 0:
+						order.append(dependent)
+		return order
+	
+	def _on_reconfigure(self, window):
+		if window is self._writing:
+			return
+		
+		if self._solving:
+			self._pending.add(window)
+		else:
+			self._solve_from(self._watchers.get(window, ()))
+	
+	def _solve_from(self, constraints):
+		""" Solves constraints and everything depending on them, in order """
+		
+		parent = self._parent()
+		if parent is None:
+			return
+		
+		self._solving = True
+		try:
+			for _ in xrange(self.max_passes):
+				
+				affected = set()
+				stack = list(constraints)
+				while stack:
+					constraint = stack.pop()
+					if constraint in affected or not constraint.alive:
+						continue
+					
+					key = (weakref.ref(constraint.window), constraint.axis)
+					if self._constraints.get(key) is constraint:
+						affected.add(constraint)
+						stack.extend(self._dependents.get(key, ()))
+				
+				for constraint in self._ordered(affected):
+					window = constraint.window
+					value = constraint.solve(parent)
+					current = getattr(window, constraint.axis)
+					
+					if current != value or type(current) is not type(value):
+						self._writing = window
+						try:
+							setattr(window, constraint.axis, value)
+						finally:
+							self._writing = None
+				
+				if not self._pending:
+					return
+				
+				constraints = [constraint for window in self._pending
+								for constraint in self._watchers.get(window, ())]
+				self._pending = set()
+		finally:
+			self._solving = False
+			self._pending = set()
+		
+		warnings.warn("Poses of {}'s children did not settle".format(
+						parent.__class__.__name__), RuntimeWarning)
+
 class Poser(object):
 	
 	def __init__(self, window):
 		self.window = window
-
-	def _bind_windows(self, windows, callback):
-		for window in windows:
-			window.bind(pygame.gui.window.Window.RECONFIGURE, callback)
-			window.trigger(pygame.gui.window.Window.RECONFIGURE)
-
+	
+	def _constrain(self, axis, function, others=(), rel=None, uses_parent=False):
+		Solver.for_window(self.window.parent).add(
+					Constraint(self.window, axis, function, others, rel, uses_parent))
+	
 	def centre(self):
 		""" Centre window on its parent """
 		
-		def _centre(parent):
-			self.window.x = (parent.actual_width / 2) - (self.window.actual_width / 2)
-			self.window.y = (parent.actual_height / 2) - (self.window.actual_height / 2)
-		
-		self._bind_windows([self.window.parent], _centre)
+		self._constrain("x", _centre_x, uses_parent=True)
+		self._constrain("y", _centre_y, uses_parent=True)
 		
 		return self
 	
@@ -45,24 +324,17 @@ class Poser(object):
 			windows should be siblings of the one being posed.
 		"""
 		
-		def _above(win):
-			swin = max(windows, key=lambda w: w.requested_y)
-			self.window.y = swin.requested_y - self.window.actual_height
-		
-		self._bind_windows(windows, _above)
-		
+		self._constrain("y", _above, windows)
+		return self
+	
 	def below(self, *windows):
 		""" Positions the window underneath all the others. All specified
 			windows should be siblings of the one being posed.
 		"""
 		
-		def _below(win):
-			swin = max(windows, key=lambda w: w.requested_y + w.actual_height)
-			self.window.y = swin.requested_y + swin.actual_height
-		
-		self._bind_windows(windows, _below)	
+		self._constrain("y", _below, windows)
 		return self
-		
+	
 	def right_of(self, *others):
 		"""
 			Positions the window to the right of the rightmost selection
@@ -70,11 +342,7 @@ class Poser(object):
 			one being posed.
 		"""
 		
-		def _right_of(win):
-			swin = max(others, key=lambda w: w.requested_x + w.actual_width)
-			self.window.x = swin.requested_x + swin.actual_width
-		
-		self._bind_windows(others, _right_of)
+		self._constrain("x", _right_of, others)
 		return self
 	
 	def left_of(self, *windows):
@@ -84,11 +352,7 @@ class Poser(object):
 			one being posed.
 		"""
 		
-		def _left_of(win):
-			swin = min(windows, key=lambda w: w.requested_x)
-			self.window.x = swin.requested_x - self.window.actual_width
-			
-		self._bind_windows(windows, _left_of)
+		self._constrain("x", _left_of, windows)
 		return self
 	
 	def align_vertical(self, window, rel=TOP):
@@ -96,16 +360,5 @@ class Poser(object):
 		if rel in str_id_map:
 			rel = str_id_map[rel]
 		
-		def _align_vertical(win):
-			
-			if rel == TOP:
-				self.window.y = window.y
-			elif rel == MIDDLE:
-				self.window.y = window.y - ((self.window.actual_height - window.actual_height) / 2)
-			elif rel == BOTTOM:
-				max_h = max(window.actual_height, self.window.actual_height)
-				min_h = min(window.actual_height, self.window.actual_height)
-				self.window.y = window.y + (max_h - min_h)
-
-		self._bind_windows([window], _align_vertical)
+		self._constrain("y", _align_vertical, [window], rel)
 		return self
@@ -0,0 +1,109 @@
+
+import weakref
+
+import pygame
+import pygame.gui.cache
+
+# Scaling qualities, fastest first
+NEAREST = 1 # pygame.transform.scale
+SMOOTH = 2 # pygame.transform.smoothscale
+MIPMAP = 3 # Nearest neighbour from a prefiltered chain of halvings
+
+# Scaled copies of surfaces, budgeted in bytes of pixel data
+scaled_cache = pygame.gui.cache.LRUCache(16 * 1024 * 1024,
+				pygame.gui.cache.surface_cost)
+
+# Mip chains below their sources, costed as the combined size of their
+# levels
+mipmap_cache = pygame.gui.cache.LRUCache(16 * 1024 * 1024,
+				lambda chain: sum(pygame.gui.cache.surface_cost(level) for level in chain))
+
+# Entries are keyed on the id of their source rather than the source
+# itself, which would keep it alive outside the budget, and are dropped
+# when the source is collected.
+_sources = {} # id(source) -> weakref to source
+_scaled_keys = {} # id(source) -> keys of scaled_cache it may have entries under
+
+def _key(source):
+	ident = id(source)
+	if ident not in _sources:
+		_sources[ident] = weakref.ref(source, lambda ref: _forget(ident))
+	return ident
+
+def _smoothscale(surface, size):
+	# smoothscale only copes with 24 and 32 bit surfaces
+	if surface.get_bitsize() < 24:
+		return pygame.transform.scale(surface, size)
+	return pygame.transform.smoothscale(surface, size)
+
+def mip_chain(source):
+	"""
+		Returns a list of copies of source, each half the size of the
+		one before, starting with source itself and ending at a single
+		pixel.
+	"""
+	key = _key(source)
+	levels = mipmap_cache.get(key)
+	
+	if levels is None:
+		levels = []
+		level = source
+		width, height = source.get_size()
+		while width > 1 or height > 1:
+			width, height = max(1, width // 2), max(1, height // 2)
+			level = _smoothscale(level, (width, height))
+			levels.append(level)
+		
+		mipmap_cache.put(key, levels)
+	
+	return [source] + levels
+
+def scale(source, size, quality=SMOOTH):
+	"""
+		Returns source scaled to size. Results are cached per source,
+		size and quality, so the returned surface may be shared and
+		must not be modified. Sources are assumed not to change; call
+		forget() after drawing on one.
+	"""
+	size = tuple(size)
+	if source.get_size() == size:
+		return source
+	
+	key = (_key(source), size, quality)
+	scaled = scaled_cache.get(key)
+	
+	if scaled is None:
+		if quality == NEAREST:
+			scaled = pygame.transform.scale(source, size)
+		elif quality == MIPMAP:
+			# Start from the smallest level that is still at least as
+			# big as the target so that nothing is lost to aliasing
+			level = source
+			for candidate in mip_chain(source):
+				if candidate.get_width() < size[0] or candidate.get_height() < size[1]:
+					break
+				level = candidate
+			scaled = pygame.transform.scale(level, size)
+		else:
+			scaled = _smoothscale(source, size)
+		
+		scaled_cache.put(key, scaled)
+		
+		# Keys the cache has evicted are pruned once they make up over
+		# half of the source's, so the index stays in proportion to it
+		keys = _scaled_keys.setdefault(key[0], set())
+		keys.add(key)
+		if len(keys) > 2 * len(scaled_cache):
+			_scaled_keys[key[0]] = set(cached for cached in keys if cached in scaled_cache)
+	
+	return scaled
+
+def forget(source):
+	""" Drops everything cached for source """
+	_forget(id(source))
+
+def _forget(ident):
+	_sources.pop(ident, None)
+	mipmap_cache.discard(ident)
+	for key in _scaled_keys.pop(ident, ()):
+		scaled_cache.discard(key)
@@ -0,0 +1,98 @@
+
+import pygame
+import pygame.gui.cache
+
+# Composites of image based skins at the sizes they have been drawn at,
+# budgeted in bytes of pixel data.
+composite_cache = pygame.gui.cache.LRUCache(8 * 1024 * 1024,
+				pygame.gui.cache.surface_cost)
+
+class NineSlice(object):
+	"""
+		Background and border of a window split into nine pieces: four
+		corners drawn as they are, four edges stretched along the sides
+		between them and a centre stretched to fill the middle. The
+		margins give the widths of the left and right columns and the
+		heights of the top and bottom rows.
+		
+		Each piece is either None, to leave that part of the window
+		alone, a colour to fill it with or a surface. Skins made only of
+		colours are drawn with fills; those with surfaces are composed
+		once for each size they are drawn at and reused from then on.
+	"""
+	
+	def __init__(self, pieces, margins):
+		self.pieces = tuple(tuple(row) for row in pieces) # Rows of (left, centre, right)
+		self.margins = tuple(margins) # (left, top, right, bottom)
+		self._has_images = any(isinstance(piece, pygame.Surface)
+					for row in self.pieces for piece in row)
+	
+	@classmethod
+	def from_image(cls, image, left, top, right, bottom):
+		"""
+			Slices image into a skin, taking the corners from the
+			margins of the image given.
+		"""
+		width, height = image.get_size()
+		columns = [(0, left), (left, width - left - right), (width - right, right)]
+		rows = [(0, top), (top, height - top - bottom), (height - bottom, bottom)]
+		
+		pieces = [[image.subsurface((x, y, w, h)).copy() if w > 0 and h > 0 else None
+					for x, w in columns]
+					for y, h in rows]
+		
+		return cls(pieces, (left, top, right, bottom))
+	
+	def _slices(self, rect):
+		""" Returns the rects of the nine pieces when drawn to fill rect """
+		
+		left, top, right, bottom = self.margins
+		centre_width = max(0, rect.width - left - right)
+		centre_height = max(0, rect.height - top - bottom)
+		
+		columns = [(rect.left, left),
+					(rect.left + left, centre_width),
+					(rect.right - right, right)]
+		rows = [(rect.top, top),
+					(rect.top + top, centre_height),
+					(rect.bottom - bottom, bottom)]
+		
+		return [[pygame.Rect(x, y, w, h) for x, w in columns] for y, h in rows]
+	
+	def compose(self, size):
+		""" Returns the skin rendered at size, which is cached and so must not be modified """
+		
+		key = (self, size)
+		composite = composite_cache.get(key)
+		
+		if composite is None:
+			composite = pygame.Surface(size, pygame.SRCALPHA)
+			self._draw_pieces(composite, composite.get_rect())
+			composite_cache.put(key, composite)
+		
+		return composite
+	
+	def _draw_pieces(self, surface, rect):
+		for pieces, slices in zip(self.pieces, self._slices(rect)):
+			for piece, area in zip(pieces, slices):
+				if piece is None or area.width <= 0 or area.height <= 0:
+					continue
+				
+				if isinstance(piece, pygame.Surface):
+					if piece.get_size() != area.size:
+						piece = pygame.transform.scale(piece, area.size)
+					surface.blit(piece, area)
+				else:
+					# Clipped as fill() doesn't handle a negative left or top
+					surface.fill(piece, area.clip(surface.get_clip()))
+	
+	def draw(self, surface, rect):
+		""" Draws the skin onto surface stretched to fill rect """
+		
+		if rect.width <= 0 or rect.height <= 0:
+			return
+		
+		if self._has_images:
+			surface.blit(self.compose(rect.size), rect)
+		else:
+			self._draw_pieces(surface, rect)
@@ -0,0 +1,86 @@
+
+class GridIndex(object):
+	"""
+		Buckets windows into the cells of a uniform grid according to
+		their rects so that the windows under a point can be found
+		without testing every window in the tree.
+		
+		Windows are re-bucketed lazily; invalidate() marks a window
+		whose geometry may have changed and the next query picks up
+		its new rect.
+	"""
+	
+	def __init__(self, cell_size=64):
+		self.cell_size = cell_size
+		self._cells = {} # (column, row) -> set of windows
+		self._window_cells = {} # window -> cells it is bucketed in
+		self._stale = set()
+	
+	def __len__(self):
+		self._flush()
+		return len(self._window_cells)
+	
+	def invalidate(self, window):
+		""" Marks the window as needing to be (re-)bucketed """
+		self._stale.add(window)
+	
+	def remove(self, window):
+		""" Drops the window from the index altogether """
+		self._stale.discard(window)
+		self._unplace(window)
+	
+	def _place(self, window):
+		rect = window.geometry.rect
+		if rect.width <= 0 or rect.height <= 0:
+			return
+		
+		size = self.cell_size
+		cells = [(column, row)
+					for column in xrange(rect.left // size, (rect.right - 1) // size + 1)
+					for row in xrange(rect.top // size, (rect.bottom - 1) // size + 1)]
+		
+		for cell in cells:
+			if cell not in self._cells:
+				self._cells[cell] = set()
+			self._cells[cell].add(window)
+		
+		self._window_cells[window] = cells
+	
+	def _unplace(self, window):
+		for cell in self._window_cells.pop(window, ()):
+			windows = self._cells[cell]
+			windows.discard(window)
+			if not windows:
+				del self._cells[cell]
+	
+	def _flush(self):
+		stale = self._stale
+		self._stale = set()
+		
+		for window in stale:
+			self._unplace(window)
+			self._place(window)
+	
+	def query(self, pos):
+		""" Returns an unordered list of the windows whose rects contain pos """
+		
+		if self._stale:
+			self._flush()
+		
+		cell = (int(pos[0]) // self.cell_size, int(pos[1]) // self.cell_size)
+		return [window for window in self._cells.get(cell, ())
+					if window.geometry.rect.collidepoint(pos)]
+	
+	def query_rect(self, rect):
+		""" Returns an unordered list of the windows whose rects overlap rect """
+		
+		if self._stale:
+			self._flush()
+		
+		size = self.cell_size
+		found = set()
+		for column in xrange(rect.left // size, (rect.right - 1) // size + 1):
+			for row in xrange(rect.top // size, (rect.bottom - 1) // size + 1):
+				found.update(self._cells.get((column, row), ()))
+		
+		return [window for window in found if window.geometry.rect.colliderect(rect)]
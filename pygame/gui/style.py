@@ -0,0 +1,120 @@
+
+import operator
+
+import pygame.gui.cache
+
+class Theme(object):
+	"""
+		Immutable set of style values for classes of window, given as
+		a dictionary of window classes to dictionaries of attribute
+		values such as
+			
+			Theme({Window: {"font_name": "Verdana"},
+					Button: {"background": (0x30, 0x60, 0xa0)}})
+		
+		Values given for a class apply to its subclasses too, unless
+		the subclass is given values of its own, and attributes the
+		theme doesn't give take the class's default_<attr>.
+		
+		A window uses the theme it was given, or else its parent's.
+	"""
+	
+	__slots__ = ("_styles", "_values")
+	
+	def __init__(self, styles=None):
+		self._styles = {cls: dict(values) for cls, values in (styles or {}).iteritems()}
+		self._values = {} # Class -> values for it, worked out when first needed
+	
+	def __repr__(self):
+		return "Theme({!r})".format(self._styles)
+	
+	def derive(self, styles):
+		""" Returns a new theme with the values in styles on top of this theme's """
+		
+		combined = {cls: dict(values) for cls, values in self._styles.iteritems()}
+		for cls, values in styles.iteritems():
+			combined.setdefault(cls, {}).update(values)
+		return Theme(combined)
+	
+	def values_for(self, cls):
+		""" Dictionary of the value of each of cls's style attributes with this theme """
+		
+		values = self._values.get(cls)
+		if values is None:
+			attrs = cls._style_attrs
+			values = {attr: getattr(cls, "default_" + attr) for attr in attrs}
+			for base in reversed(cls.__mro__):
+				for attr, value in self._styles.get(base, {}).iteritems():
+					if attr in attrs:
+						values[attr] = value
+			self._values[cls] = values
+		return values
+
+# Theme of windows that aren't given one and have no parent to take
+# one from, which leaves every attribute at its class's default
+default_theme = Theme()
+
+class Style(object):
+	"""
+		Resolved style of the windows of a class which have the same
+		theme and override the same attributes with the same values,
+		shared between all of them. Style values are read as attributes
+		along with the theme and overrides, a sorted tuple of
+		(attribute, value) pairs, they were resolved from. Styles can't
+		be changed; windows are given a different one instead.
+	"""
+	
+	def __init__(self, theme, overrides, values):
+		state = self.__dict__
+		state.update(values)
+		state.update(overrides)
+		state["theme"] = theme
+		state["overrides"] = overrides
+	
+	def __setattr__(self, attr, value):
+		raise AttributeError("Style objects can't be changed")
+	
+	def __delattr__(self, attr):
+		raise AttributeError("Style objects can't be changed")
+	
+	def __repr__(self):
+		return "<Style {!r} overriding {!r}>".format(self.theme, self.overrides)
+
+# Styles resolved for (class, theme, overrides), budgeted by number of
+# entries. Windows keep the Style they were given so those evicted
+# are only resolved again for new windows.
+style_cache = pygame.gui.cache.LRUCache(4096)
+
+def resolve(cls, theme, overrides=()):
+	"""
+		Returns the Style of windows of class cls with theme, overriding
+		the attribute values in the sorted tuple of (attribute, value)
+		pairs overrides.
+	"""
+	key = (cls, theme, overrides)
+	try:
+		style = style_cache.get(key)
+	except TypeError:
+		# Overridden with an unhashable value, such as a list for a
+		# colour, so the style can't be shared
+		return Style(theme, overrides, theme.values_for(cls))
+	
+	if style is None:
+		style = Style(theme, overrides, theme.values_for(cls))
+		style_cache.put(key, style)
+	return style
+
+def attribute(name):
+	"""
+		Property for the style attribute name of a window. It is read
+		from the window's Style, and writing it overrides the value for
+		the window alone until it is deleted.
+	"""
+	def override(window, value):
+		window._override(name, value)
+	
+	def reset(window):
+		window._override(name)
+	
+	return property(operator.attrgetter("_style." + name), override, reset,
+					"The window's {}, from its style".format(name))
@@ -0,0 +1,222 @@
+
+import Queue
+import weakref
+import threading
+import collections
+
+import pygame
+import pygame.gui.cache
+
+# Rendered text surfaces shared between all windows. The budget is in
+# bytes of pixel data and can be changed at any time.
+surface_cache = pygame.gui.cache.LRUCache(4 * 1024 * 1024,
+				pygame.gui.cache.surface_cost)
+
+# Text sizes and font heights keyed on font style, budgeted by number
+# of entries.
+measure_cache = pygame.gui.cache.LRUCache(8192)
+
+_fonts = {} # Style -> pygame.font.Font
+
+def get_font(style):
+	"""
+		Returns the font for a (name, size, bold, italic, underline)
+		style tuple. Each style gets a Font of its own, so the returned
+		font is shared and must not be modified.
+	"""
+	font = _fonts.get(style)
+	
+	if font is None:
+		font = _fonts[style] = _open_font(style)
+	
+	return font
+
+def _open_font(style):
+	name, size, bold, italic, underline = style
+	try:
+		font = pygame.font.Font(name, size)
+	except IOError:
+		font = pygame.font.SysFont(name, size)
+	
+	font.set_bold(bold)
+	font.set_italic(italic)
+	font.set_underline(underline)
+	return font
+
+def size(style, text):
+	""" Memoised equivalent of get_font(style).size(text) """
+	
+	key = (style, text)
+	dimensions = measure_cache.get(key)
+	
+	if dimensions is None:
+		dimensions = get_font(style).size(text)
+		measure_cache.put(key, dimensions)
+	
+	return dimensions
+
+def get_height(style):
+	""" Memoised equivalent of get_font(style).get_height() """
+	
+	key = (style,)
+	height = measure_cache.get(key)
+	
+	if height is None:
+		height = get_font(style).get_height()
+		measure_cache.put(key, height)
+	
+	return height
+
+def advance(style, char):
+	"""
+		Memoised horizontal advance of a single character, being how
+		far along the next character starts.
+	"""
+	key = (style, char, "advance")
+	width = measure_cache.get(key)
+	
+	if width is None:
+		metrics = get_font(style).metrics(char)
+		if metrics and metrics[0] is not None:
+			width = metrics[0][4]
+		else:
+			width = size(style, char)[0]
+		measure_cache.put(key, width)
+	
+	return width
+
+def _colour_key(colour):
+	return tuple(colour) if colour is not None else None
+
+def render(style, text, antialias, colour, background=None):
+	"""
+		Renders text in the font described by style, reusing a previous
+		rendering of the same text with the same style and colours where
+		possible. The returned surface may be shared so must not be
+		drawn on.
+	"""
+	key = _render_key(style, text, antialias, colour, background)
+	
+	surface = surface_cache.get(key)
+	if surface is None:
+		surface = _render(get_font(style), text, antialias, colour, background)
+		surface_cache.put(key, surface)
+	
+	return surface
+
+def _render_key(style, text, antialias, colour, background):
+	return (style, antialias, _colour_key(colour), _colour_key(background), text)
+
+def _render(font, text, antialias, colour, background):
+	if background is None:
+		return font.render(text, antialias, colour)
+	return font.render(text, antialias, colour, background)
+
+class RenderPool(object):
+	"""
+		Renders text on worker threads so that a screen full of new
+		text doesn't hold up the frame that first draws it.
+		
+		render() returns a cached rendering straight away, as the
+		module's render() does, but otherwise queues the text to be
+		rendered by a worker and returns None. Finished renderings are
+		handed over by install(), which RootWindow.draw() calls at the
+		start of each frame, and the windows that asked for them are
+		redrawn. Each window is kept the rendering it asked for until
+		it next calls render(), so a batch larger than the surface
+		cache's budget isn't evicted before it is shown.
+		
+		Fonts aren't safe to share between threads so each worker opens
+		its own. Rendering holds the GIL, so the pool spreads renders
+		across frames rather than using more cores, and more than the
+		one worker it defaults to rarely helps.
+	"""
+	
+	def __init__(self, workers=1):
+		self._requests = Queue.Queue()
+		self._finished = collections.deque() # (key, request, surface or None if it failed)
+		self._waiting = {} # Key -> windows waiting for it to be rendered
+		self._ready = weakref.WeakKeyDictionary() # Window -> (key, surface) rendered for it
+		
+		self._threads = []
+		for _ in xrange(max(1, workers)):
+			thread = threading.Thread(target=self._work, name="pygame.gui.text.RenderPool")
+			thread.daemon = True
+			thread.start()
+			self._threads.append(thread)
+	
+	def __len__(self):
+		""" Number of renderings queued or in progress """
+		return len(self._waiting)
+	
+	def render(self, window, style, text, antialias, colour, background=None):
+		"""
+			Returns the rendering of text from the surface cache, or
+			None after queueing it to be rendered. In which case window
+			will be redrawn once it has been.
+		"""
+		key = _render_key(style, text, antialias, colour, background)
+		
+		ready = self._ready.pop(window, None)
+		if ready is not None and ready[0] == key:
+			return ready[1]
+		
+		surface = surface_cache.get(key)
+		if surface is not None:
+			return surface
+		
+		waiting = self._waiting.get(key)
+		if waiting is None:
+			waiting = self._waiting[key] = weakref.WeakSet()
+			self._requests.put((key, (style, text, antialias, colour, background)))
+		waiting.add(window)
+	
+	def install(self):
+		"""
+			Hands the renderings finished since the last call to the
+			windows waiting for them, and returns those windows. The
+			renderings are also put into the surface cache for other
+			windows to share. Text a worker failed to render is
+			rendered here instead, so any error is raised by the caller.
+		"""
+		windows = []
+		while self._finished:
+			key, request, surface = self._finished.popleft()
+			if surface is None:
+				surface = _render(get_font(request[0]), *request[1:])
+			
+			surface_cache.put(key, surface)
+			for window in self._waiting.pop(key, ()):
+				self._ready[window] = (key, surface)
+				windows.append(window)
+		
+		return windows
+	
+	def close(self):
+		""" Stops the workers once they have finished the renderings already queued """
+		
+		for _ in self._threads:
+			self._requests.put(None)
+		for thread in self._threads:
+			thread.join()
+		self._threads = []
+	
+	def _work(self):
+		fonts = {}
+		
+		while True:
+			job = self._requests.get()
+			if job is None:
+				return
+			
+			key, request = job
+			style = request[0]
+			try:
+				font = fonts.get(style)
+				if font is None:
+					font = fonts[style] = _open_font(style)
+				surface = _render(font, *request[1:])
+			except Exception:
+				surface = None
+			
+			self._finished.append((key, request, surface))
@@ -2,11 +2,26 @@
 import logging
 log = logging.getLogger(__name__)
 
+import sys
 import types
+import bisect
+import itertools
 import inspect
+import contextlib
+import collections
+import functools
 
 import pygame
 import pygame.gui.poser
+import pygame.gui.spatial
+import pygame.gui.text
+import pygame.gui.cache
+import pygame.gui.skin
+import pygame.gui.scaling
+import pygame.gui.instrument
+import pygame.gui.children
+import pygame.gui.loop
+import pygame.gui.style
 
 _current_event_id = -1
 def generate_event_id():
@@ -18,6 +33,119 @@ def explicit_window_reference(func):
 	func.require_explicit = True
 	return func
 
+def merge_rects(rects):
+	""" Unions overlapping rects until none of those returned overlap """
+	
+	merged = []
+	for rect in rects:
+		if rect.width <= 0 or rect.height <= 0:
+			continue
+		
+		rect = pygame.Rect(rect)
+		index = rect.collidelist(merged)
+		while index != -1:
+			rect.union_ip(merged.pop(index))
+			index = rect.collidelist(merged)
+		
+		merged.append(rect)
+	
+	return merged
+
+@contextlib.contextmanager
+def _unbatched():
+	""" Stands in for RootWindow.batch() for windows without a root """
+	yield
+
+def _pre_order(window):
+	""" Returns the descendants of window in paint order, without recursing """
+	
+	windows = []
+	stack = window.children[::-1]
+	while stack:
+		window = stack.pop()
+		windows.append(window)
+		stack.extend(window.children[::-1])
+	
+	return windows
+
+def _scroll_surface(surface, dx, dy):
+	"""
+		Shifts the contents of surface by (-dx, -dy), as when the view
+		it holds is scrolled by (dx, dy), and returns the rects left
+		uncovered that need to be drawn afresh.
+	"""
+	width, height = surface.get_size()
+	if abs(dx) >= width or abs(dy) >= height:
+		return [surface.get_rect()]
+	
+	surface.scroll(-dx, -dy)
+	
+	exposed = []
+	if dy > 0:
+		exposed.append(pygame.Rect(0, height - dy, width, dy))
+	elif dy < 0:
+		exposed.append(pygame.Rect(0, 0, width, -dy))
+	if dx > 0:
+		exposed.append(pygame.Rect(width - dx, 0, dx, height))
+	elif dx < 0:
+		exposed.append(pygame.Rect(0, 0, -dx, height))
+	
+	return exposed
+
+def border_colours(style, colour):
+	"""
+		Returns the colours of the top and left edges and of the bottom
+		and right edges of a border of the given style and colour, or
+		None for unknown styles.
+	"""
+	if style == Window.BORDER_STYLE_SOLID:
+		return colour, colour
+	
+	hilight = [sum(cs) / len(cs) for cs in zip(colour, (255, 255, 255), (255, 255, 255))]
+	if style == Window.BORDER_STYLE_OUTSET:
+		return hilight, colour
+	elif style == Window.BORDER_STYLE_INSET:
+		return colour, hilight
+	return None
+
+# Windows painted by a RootWindow's draw(), and those it skipped
+# because they were covered by opaque windows above them or were
+# outside the area being drawn
+PaintCounts = collections.namedtuple("PaintCounts", ["drawn", "occluded", "offscreen"])
+
+class Geometry(object):
+	"""
+		Placement of a window as calculated by a layout pass. Instances
+		are cached by Window.geometry and thrown away whenever the
+		layout of the window is invalidated. The rects are shared, so
+		treat them as read-only.
+	"""
+	
+	__slots__ = ("x", "y", "width", "height",
+				"available_width", "available_height",
+				"requested_x", "requested_y",
+				"requested_width", "requested_height",
+				"rect", "content_rect")
+	
+	def __init__(self, x, y, width, height, inset,
+				requested_x, requested_y, requested_width, requested_height):
+		
+		self.x = x
+		self.y = y
+		self.width = width
+		self.height = height
+		self.available_width = width - 2 * inset
+		self.available_height = height - 2 * inset
+		self.requested_x = requested_x
+		self.requested_y = requested_y
+		self.requested_width = requested_width
+		self.requested_height = requested_height
+		
+		self.rect = pygame.Rect((x, y), (width, height))
+		self.content_rect = self.rect.move(inset, inset)
+		self.content_rect.width -= int(2 * inset)
+		self.content_rect.height -= int(2 * inset)
+
 class Window(object):
 	
 	MOUSEOVER = generate_event_id()
@@ -48,11 +176,94 @@ class Window(object):
 	default_font_size = 14
 	default_font_colour = (0, 0, 0)
 	default_font_aa = True
+	default_skin = None
+	
+	# Attributes which influence the geometry of the window. Writing
+	# to any of them invalidates the cached layout of the window's
+	# subtree and triggers Window.RECONFIGURE.
+	_geometry_attrs = frozenset(["width", "height", "x", "y", "padding", "border_width"])
+	
+	# Windows keep their attributes in slots, rather than a __dict__,
+	# so large numbers of them stay small. Subclasses list the slots
+	# for the attributes they add; those which don't get a __dict__.
+	__slots__ = ("__weakref__",
+				"_geometry", "_root", "_solver", "_viewport", "_retained_surface",
+				"_callbacks", "_handlers",
+				"surface", "surface_area", "redraw", "retained", "parent", "children",
+				"_z_index", "_below", "_above", "_siblings",
+				"_style", "_theme",
+				"width", "height", "x", "y")
 	
-	_font_cache = {}
+	# Style attributes, mapped to the keyword argument that overrides
+	# them on creation. They are read from the window's Style, which
+	# is shared with other windows of the same class that have the
+	# same theme and overrides, so a window only holds a reference to
+	# it. Writing one overrides it for the window alone; deleting it
+	# goes back to the theme's value.
+	_style_attrs = {
+		"background": "background",
+		"border_width": "border_width",
+		"border_colour": "border_colour",
+		"border_style": "border_style",
+		"padding": "padding",
+		"font_name": "font",
+		"font_colour": "font_colour",
+		"font_size": "font_size",
+		"font_aa": "font_aa",
+		"skin": "skin",
+		}
+	
+	background = pygame.gui.style.attribute("background")
+	border_width = pygame.gui.style.attribute("border_width")
+	border_colour = pygame.gui.style.attribute("border_colour")
+	border_style = pygame.gui.style.attribute("border_style")
+	padding = pygame.gui.style.attribute("padding")
+	font_name = pygame.gui.style.attribute("font_name")
+	font_colour = pygame.gui.style.attribute("font_colour")
+	font_size = pygame.gui.style.attribute("font_size")
+	font_aa = pygame.gui.style.attribute("font_aa")
+	skin = pygame.gui.style.attribute("skin")
+	
+	# Other attributes which take the class's default_<attr> unless
+	# given, mapped to the keyword argument that sets them on
+	# creation. Any left unset, or deleted, read as the class's
+	# current default.
+	_default_attrs = {}
+	
+	# Whether the window's requested size is derived from that of its
+	# children, in which case changes to a child's geometry invalidate
+	# the window's too.
+	sized_by_children = False
+	
+	# Whether the window is a viewport onto its children, which are
+	# laid out on a plane of their own and scrolled. Windows keep track
+	# of the nearest such window above them in _viewport.
+	scrollable = False
 	
 	def __init__(self, parent=None, **kwargs):
 		
+		object.__setattr__(self, "_geometry", None)
+		
+		# The RootWindow the window is currently attached to, if any
+		object.__setattr__(self, "_root", None)
+		
+		# pygame.gui.poser.Solver for the poses of the window's
+		# children, created when the first of them is posed
+		object.__setattr__(self, "_solver", None)
+		object.__setattr__(self, "_viewport", None)
+		
+		# Event type -> callbacks, in the order bound, and the handlers
+		# ready to call for them; created when the first is bound
+		object.__setattr__(self, "_callbacks", None)
+		object.__setattr__(self, "_handlers", None)
+		
+		# Retained windows are composited together with their
+		# descendants onto an offscreen surface which is reused, with
+		# a single blit, until something within the subtree changes.
+		# Descendants are clipped to the retained window's rect.
+		self.retained = False
+		object.__setattr__(self, "_retained_surface", None)
+		
 		self.surface = None
 		self.surface_area = None
 		self.redraw = True
@@ -61,36 +272,180 @@ class Window(object):
 		# errors. Redraw only occurs once the RootWindow needs it to;
 		# to force a redraw call draw() directly.
 		
+		# Children are kept in a pygame.gui.children.ChildList, made
+		# when the first is added, which the window is linked into
+		# among its siblings
+		object.__setattr__(self, "_z_index", kwargs.get("z_index", 0))
+		object.__setattr__(self, "_below", None)
+		object.__setattr__(self, "_above", None)
+		object.__setattr__(self, "_siblings", None)
+		
+		# The window's own theme, if it was given one rather than
+		# taking its parent's, and its resolved style. The skin, if
+		# set, is a pygame.gui.skin.NineSlice which is drawn in place
+		# of the window's background and border.
+		theme = kwargs.get("theme")
+		object.__setattr__(self, "_theme", theme)
+		if theme is None:
+			theme = parent.theme if parent is not None else pygame.gui.style.default_theme
+		object.__setattr__(self, "_style", pygame.gui.style.resolve(self.__class__, theme,
+						tuple(sorted((attr, kwargs[kwarg]) for attr, kwarg
+								in self._style_attrs.iteritems() if kwarg in kwargs))))
+		
 		self.parent = parent
-		self.children = []
-		self.callbacks = {}
+		self.children = ()
 
 		self.reparent(parent)
 		
-		self._kwargs = kwargs
-		
 		# Float for relative dimensions/positions, integer for absolute
 		self.width = kwargs.get("width", 1.0)
 		self.height = kwargs.get("height", 0)
 		self.x = kwargs.get("x", 0)
 		self.y = kwargs.get("y", 0)
 		
-		self.background = kwargs.get("background", self.__class__.default_background)
-		self.border_width = kwargs.get("border_width", self.__class__.default_border_width)
-		self.border_colour = kwargs.get("border_colour", self.__class__.default_border_colour)
-		self.border_style = kwargs.get("border_style", self.__class__.default_border_style)
-		self.padding = kwargs.get("padding", self.__class__.default_padding)
-		self.font_name = kwargs.get("font", self.__class__.default_font_name)
-		self.font_colour = kwargs.get("font_colour", self.__class__.default_font_colour)
-		self.font_size = kwargs.get("font_size", self.__class__.default_font_size)
-		self.font_aa = kwargs.get("font_aa", self.__class__.default_font_aa)
+		# The defaults are copied into the window's slots as reading
+		# an empty slot, and falling back to the class, is much slower.
+		cls = self.__class__
+		for attr, kwarg in self._default_attrs.iteritems():
+			setattr(self, attr, kwargs[kwarg] if kwarg in kwargs
+							else getattr(cls, "default_" + attr))
+	
+	def __getattr__(self, attr):
+		# Only reached when attr hasn't been set on the window
+		if attr in self._default_attrs:
+			return getattr(self.__class__, "default_" + attr)
+		raise AttributeError("'{}' object has no attribute '{}'".format(
+						self.__class__.__name__, attr))
 	
 	def __setattr__(self, attr, value):
-		object.__setattr__(self, "redraw", True)
+		root = self._root
+		if root is not None and root._batch_depth:
+			root._batched_redraw.add(self)
+		else:
+			object.__setattr__(self, "redraw", True)
+			if root is not None:
+				root._damaged_windows.add(self)
+		
 		object.__setattr__(self, attr, value)
-		if attr in {"width", "height", "x", "y", "padding", "border_width"}:
+		if attr in self._geometry_attrs:
+			self._reconfigure()
+		elif attr == "retained" and root is not None:
+			root._compositing_changed()
+	
+	def __delattr__(self, attr):
+		# Deleting a style attribute goes back to the theme's value, so
+		# is a change like any other
+		object.__delattr__(self, attr)
+		
+		root = self._root
+		if root is not None and root._batch_depth:
+			root._batched_redraw.add(self)
+		else:
+			object.__setattr__(self, "redraw", True)
+			if root is not None:
+				root._damaged_windows.add(self)
+		
+		if attr in self._geometry_attrs:
+			self._reconfigure()
+	
+	def _reconfigure(self):
+		"""
+			Invalidates the window's layout and triggers RECONFIGURE,
+			or queues it if the window's root is in the middle of a
+			batch.
+		"""
+		self._invalidate_geometry()
+		
+		root = self._root
+		if root is not None and root._batch_depth:
+			root._defer_reconfigure(self)
+		else:
 			self.trigger(Window.RECONFIGURE)
 
+	def _attributes(self):
+		""" Dictionary of the attributes set on the window, for debugging """
+		
+		attributes = dict(getattr(self, "__dict__", {}))
+		for cls in self.__class__.__mro__:
+			for attr in cls.__dict__.get("__slots__", ()):
+				if attr != "__weakref__" and hasattr(self, attr):
+					attributes[attr] = getattr(self, attr)
+		for attr in self._style_attrs:
+			attributes[attr] = getattr(self, attr)
+		return attributes
+	
+	@property
+	def style(self):
+		""" The window's pygame.gui.style.Style, which is shared and can't be changed """
+		return self._style
+	
+	@property
+	def theme(self):
+		""" The pygame.gui.style.Theme the window is styled with, its own or else its parent's """
+		return self._style.theme
+	
+	@theme.setter
+	def theme(self, theme):
+		# None takes the parent's theme again
+		object.__setattr__(self, "_theme", theme)
+		self._restyle()
+	
+	def _override(self, attr, *value):
+		"""
+			Overrides the style attribute attr with value for the
+			window alone or, without a value, removes the override.
+		"""
+		
+		style = self._style
+		overrides = [override for override in style.overrides if override[0] != attr]
+		if value:
+			overrides.append((attr, value[0]))
+			overrides.sort()
+		object.__setattr__(self, "_style",
+						pygame.gui.style.resolve(self.__class__, style.theme, tuple(overrides)))
+	
+	def _restyle(self):
+		"""
+			Resolves the style of the window, and of the descendants
+			taking their theme from it, again for the theme they should
+			now have. Those whose theme has changed are redrawn, and
+			reconfigured if their geometry is affected, all in a single
+			batch.
+		"""
+		parent = self.parent
+		theme = parent.theme if parent is not None else pygame.gui.style.default_theme
+		pending = [(self, theme)]
+		restyled = []
+		
+		# Descendants with a theme of their own, and those of windows
+		# whose theme hasn't changed, are left alone
+		while pending:
+			window, theme = pending.pop()
+			if window._theme is not None:
+				theme = window._theme
+			
+			style = window._style
+			if theme is not style.theme:
+				object.__setattr__(window, "_style",
+								pygame.gui.style.resolve(window.__class__, theme, style.overrides))
+				restyled.append((window, style))
+				pending.extend((child, theme) for child in window.children if child._theme is None)
+		
+		root = self._root
+		with root.batch() if root is not None else _unbatched():
+			for window, previous in restyled:
+				if root is not None:
+					root._batched_redraw.add(window)
+				else:
+					object.__setattr__(window, "redraw", True)
+				
+				style = window._style
+				for attr in window._geometry_attrs:
+					if (attr in window._style_attrs
+							and getattr(style, attr) != getattr(previous, attr)):
+						window._reconfigure()
+						break
+	
 	def _print_graph(self, indent=0):
 		
 		print "{}{} ({}, {}) {}x{}".format(
@@ -104,50 +459,38 @@ class Window(object):
 			child._print_graph(indent+2)
 	
 	def paint_order(self):
-		
-		windows = []
+		""" Returns the window's descendants in the order they're painted, bottom-most first """
+		return _pre_order(self)
+	
+	def _composited_paint_order(self, windows=None):
+		"""
+			Same as paint_order() except that the descendants of
+			retained and scrollable windows are left out, since they
+			are composited along with the window.
+		"""
+		if windows is None:
+			windows = []
 		
 		for child in self.children:
 			windows.append(child)
-			windows.extend(child.paint_order())
+			if not child.retained and not child.scrollable:
+				child._composited_paint_order(windows)
 		
 		return windows
-		
+	
 	@property
 	def decendants(self):
-		windows = self.children[:]
-			
-		for child in self.children:
-			windows.extend(child.decendants)
-		
-		return windows
+		""" List of the window's descendants, in paint order """
+		return self.paint_order()
 		
 	@property
 	def leaves(self):
 		""" Returns generator for the leaves of the subtree starting at this window. """
-		for child in self.children:
-			if len(child.children) == 0:
-				yield child
-			else:
-				for leaf in child.leaves:
-					yield leaf
+		return (window for window in self.paint_order() if not window.children)
 	
 	@property
 	def font(self):
-		font_config = (self.font_name, self.font_size)
-		
-		if font_config not in Window._font_cache:
-			try:
-				Window._font_cache[font_config] = pygame.font.Font(*font_config)
-			except IOError:
-				Window._font_cache[font_config] = pygame.font.SysFont(*font_config)
-		
-		font = Window._font_cache[font_config]
-		font.set_bold(False)
-		font.set_italic(False)
-		font.set_underline(False)
-		
-		return font
+		return pygame.gui.text.get_font(self.font_style)
 	
 	@font.setter
 	def font(self, values):
@@ -155,6 +498,12 @@ class Window(object):
 				["font_name", "font_colour", "font_size", "font_aa"]):
 			setattr(self, attr, value)
 	
+	@property
+	def font_style(self):
+		""" (name, size, bold, italic, underline) tuple describing the window's font """
+		style = self._style
+		return (style.font_name, style.font_size, False, False, False)
+	
 	def reparent(self, new_parent):
 		"""
 			Removes self from current parent's list of children and
@@ -162,14 +511,73 @@ class Window(object):
 			attribute as appropriate.
 		"""
 		if self.parent is not None:
-			try:
-				self.parent.children.remove(self)
-			except ValueError:
-				pass
+			self._invalidate_geometry()
+			self._discard_retained_surfaces()
+			if self._siblings is not None:
+				if self._root is not None:
+					self._root._subtree_detached(self)
+				self._siblings.remove(self)
 				
 		self.parent = new_parent
 		if self.parent is not None:
+			if not isinstance(self.parent.children, pygame.gui.children.ChildList):
+				object.__setattr__(self.parent, "children", pygame.gui.children.ChildList())
 			self.parent.children.append(self)
+			self._invalidate_geometry()
+			self._set_root(self.parent._root)
+			if self._root is not None:
+				self._root._subtree_attached(self)
+			if self._theme is None and self._style.theme is not self.parent.theme:
+				self._restyle()
+		else:
+			self._set_root(None)
+	
+	@property
+	def z_index(self):
+		"""
+			Stacking of the window among its siblings. Windows with a
+			higher z-index are painted above, and hit before, those
+			with a lower one.
+		"""
+		return self._z_index
+	
+	@z_index.setter
+	def z_index(self, z_index):
+		siblings = self._siblings
+		if siblings is None:
+			object.__setattr__(self, "_z_index", z_index)
+		elif z_index != self._z_index:
+			def move(window):
+				siblings.remove(window)
+				object.__setattr__(window, "_z_index", z_index)
+				siblings.append(window)
+			self._restack(move)
+	
+	def lift(self):
+		""" Raises the window above its siblings with the same z-index """
+		
+		above = self._above
+		if above is not None and above._z_index == self._z_index:
+			self._restack(self._siblings.lift)
+	
+	def lower(self):
+		""" Lowers the window below its siblings with the same z-index """
+		
+		below = self._below
+		if below is not None and below._z_index == self._z_index:
+			self._restack(self._siblings.lower)
+	
+	def _restack(self, move):
+		""" Calls move(window) to change where the window is stacked among its siblings """
+		
+		root = self._root
+		if root is not None:
+			root._subtree_detached(self)
+		move(self)
+		if root is not None:
+			root._subtree_attached(self)
+			root._damaged_windows.add(self)
+		self.parent._discard_retained_surfaces()
 	
 	def focus(self):
 		""" Sets the window to recieve keyboard input. """
@@ -187,74 +595,200 @@ class Window(object):
 		return window
 	
 	@property
-	def requested_width(self):
+	def geometry(self):
+		"""
+			The window's Geometry for the current layout pass. It is
+			calculated on first access and then reused until something
+			that influences the layout of the window changes.
+		"""
+		if self._geometry is None:
+			root = self._root
+			if root is not None and root.profiler is not None:
+				geometry = root.profiler.call(pygame.gui.instrument.LAYOUT,
+								self, self._calculate_geometry)
+			else:
+				geometry = self._calculate_geometry()
+			object.__setattr__(self, "_geometry", geometry)
+		return self._geometry
+	
+	def _calculate_geometry(self):
+		parent = self.parent.geometry
+		
+		requested_width = self._calculate_requested_width()
+		requested_height = self._calculate_requested_height()
+		requested_x = self._calculate_requested_x()
+		requested_y = self._calculate_requested_y()
+		
+		return Geometry(
+					parent.x + requested_x,
+					parent.y + requested_y,
+					min(requested_width, parent.available_width),
+					min(requested_height, parent.available_height),
+					self._style.padding + self._style.border_width,
+					requested_x, requested_y,
+					requested_width, requested_height)
+	
+	def _calculate_requested_width(self):
+		style = self._style
 		if type(self.width) is types.FloatType:
-			return int(round(self.width * self.parent.actual_width) + 2 * (self.padding + self.border_width))
+			return int(round(self.width * self.parent.actual_width) + 2 * (style.padding + style.border_width))
 		else:
-			return int(self.width + 2 * (self.padding + self.border_width))
+			return int(self.width + 2 * (style.padding + style.border_width))
 	
-	@property
-	def requested_height(self):
+	def _calculate_requested_height(self):
+		style = self._style
 		if type(self.height) is types.FloatType:
-			return int(round(self.height * self.parent.actual_height) + 2 * (self.padding + self.border_width))
+			return int(round(self.height * self.parent.actual_height) + 2 * (style.padding + style.border_width))
+		else:
+			return int(self.height + 2 * (style.padding + style.border_width))
+	
+	def _calculate_requested_x(self):
+		style = self.parent._style
+		if type(self.x) is types.FloatType:
+			return int(round(self.x * self.parent.actual_width)) + style.padding + style.border_width
+		else:
+			return int(self.x) + style.padding + style.border_width
+	
+	def _calculate_requested_y(self):
+		style = self.parent._style
+		if type(self.y) is types.FloatType:
+			return int(round(self.y * self.parent.actual_height)) + style.padding + style.border_width
+		else:
+			return int(self.y) + style.padding + style.border_width
+	
+	def _invalidate_geometry(self):
+		"""
+			Discards the cached geometry of the window and everything
+			beneath it. Parents that size themselves after their
+			children are invalidated along with them.
+		"""
+		window = self
+		while window.parent is not None and window.parent.sized_by_children:
+			window = window.parent
+		
+		window._discard_geometry()
+	
+	def _discard_geometry(self):
+		# A window's geometry is only ever calculated after its
+		# parent's, so if there is nothing cached here there is
+		# nothing cached further down either.
+		if self._geometry is None:
+			return
+		
+		if self._root is not None:
+			self._root._geometry_discarded(self)
+		
+		object.__setattr__(self, "_geometry", None)
+		for child in self.children:
+			child._discard_geometry()
+	
+	def _discard_retained_surfaces(self):
+		""" Drops the composites of any retained windows from this one up """
+		
+		window = self
+		while window is not None:
+			if window._retained_surface is not None:
+				object.__setattr__(window, "_retained_surface", None)
+			window = window.parent
+	
+	def _set_root(self, root):
+		if self._root is not None:
+			self._root._window_detached(self)
+		
+		parent = self.parent
+		if parent is not None and parent.scrollable:
+			object.__setattr__(self, "_viewport", parent)
 		else:
-			return int(self.height + 2 * (self.padding + self.border_width))
+			object.__setattr__(self, "_viewport", parent._viewport if parent is not None else None)
+		
+		object.__setattr__(self, "_root", root)
+		if root is not None:
+			root._window_attached(self)
+		
+		for child in self.children:
+			child._set_root(root)
+	
+	def _screen_rect(self, rect=None):
+		"""
+			Translates rect, which defaults to the window's own, from
+			where the window is laid out to where it appears on the
+			screen, clipped to the viewports of any scrollable windows
+			it is within.
+		"""
+		if rect is None:
+			rect = self.geometry.rect
+		
+		viewport = self._viewport
+		while viewport is not None:
+			rect = rect.move(-viewport.scroll_x, -viewport.scroll_y).clip(
+							viewport.geometry.content_rect)
+			viewport = viewport._viewport
+		
+		return rect
+	
+	@property
+	def requested_width(self):
+		return self.geometry.requested_width
+	
+	@property
+	def requested_height(self):
+		return self.geometry.requested_height
 	
 	@property
 	def available_width(self):
-		return self.actual_width - 2 * (self.padding + self.border_width)
+		return self.geometry.available_width
 	
 	@property
 	def available_height(self):
-		return self.actual_height - 2 * (self.padding + self.border_width)
+		return self.geometry.available_height
 	
 	@property
 	def actual_height(self):
-		return self.requested_height if self.requested_height <= self.parent.available_height else self.parent.available_height
+		return self.geometry.height
 	
 	@property
 	def actual_width(self):
-		return self.requested_width if self.requested_width <= self.parent.available_width else self.parent.available_width
+		return self.geometry.width
 	
 	@property
 	def requested_x(self):
-		if type(self.x) is types.FloatType:
-			return int(round(self.x * self.parent.actual_width)) + self.parent.padding + self.parent.border_width
-		else:
-			return int(self.x) + self.parent.padding + self.parent.border_width
+		return self.geometry.requested_x
 	
 	@property
 	def requested_y(self):
-		if type(self.y) is types.FloatType:
-			return int(round(self.y * self.parent.actual_height)) + self.parent.padding + self.parent.border_width
-		else:
-			return int(self.y) + self.parent.padding + self.parent.border_width
+		return self.geometry.requested_y
 	
 	@property
 	def actual_x(self):
-		return self.parent.actual_x + self.requested_x
+		return self.geometry.x
 	
 	@property
 	def actual_y(self):
-		return self.parent.actual_y + self.requested_y
+		return self.geometry.y
 	
 	@property
 	def rect(self):
 		""" pygame.Rect encompassing the entire window (including padding, etc) """
-		return pygame.Rect((self.actual_x, self.actual_y), (self.actual_width, self.actual_height))
+		return pygame.Rect(self.geometry.rect)
 	
 	@property
 	def content_rect(self):
 		""" Same as Window.rect but position adjusted for content padding """
-		rect = self.rect.move(self.padding + self.border_width, self.padding + self.border_width)
-		rect.height -= int(2 * (self.padding + self.border_width))
-		rect.width -= int(2 * (self.padding + self.border_width))
-		return rect
+		return pygame.Rect(self.geometry.content_rect)
 	
 	@property
 	def pose(self):
 		return pygame.gui.poser.Poser(self)
 	
+	@property
+	def opaque(self):
+		""" Whether drawing the window covers every pixel of its rect """
+		
+		style = self._style
+		background = style.background
+		return (style.skin is None and background is not None
+					and (len(background) < 4 or background[3] == 255))
+	
 	def centre(self):
 		""" Centre window within parent """
 		self.x = (self.parent.actual_width / 2) - (self.actual_width / 2)
@@ -271,41 +805,149 @@ class Window(object):
 		self.root_window.focus = self
 	
 	def bind(self, event_type, callback):
-		if event_type not in self.callbacks:
-			self.callbacks[event_type] = []
+		"""
+			Registers callback to be called when event_type is triggered
+			on the window.
+			
+			Because methods bound to this object will implicitly
+			recieve the 'self' reference when called, we customise
+			the parameters as to omit the Window/self reference
+			which we'd otherwise pass as the first parameter.
+			This behaviour can be overidden by using the
+			@explicit_window_reference decorator on the method
+			which will mean the 'self' and window (even if it
+			is 'self') references are passed as parameters.
+			
+			Which of the two applies is decided here, once, so that
+			triggering only has to call the stored handler.
+		"""
+		if (inspect.ismethod(callback) and callback.im_self is self
+				and not hasattr(callback, "require_explicit")):
+			handler = callback
+		else:
+			handler = functools.partial(callback, self)
+		
+		if self._handlers is None:
+			object.__setattr__(self, "_callbacks", {})
+			object.__setattr__(self, "_handlers", {})
+		
+		self._callbacks[event_type] = self._callbacks.get(event_type, ()) + (callback,)
+		self._handlers[event_type] = self._handlers.get(event_type, ()) + (handler,)
+	
+	def unbind(self, event_type, callback):
+		"""
+			Removes a callback previously registered with bind(). Raises
+			ValueError if it isn't bound to event_type.
+		"""
+		callbacks = self._callbacks.get(event_type, ()) if self._callbacks is not None else ()
+		if callback not in callbacks:
+			raise ValueError("callback is not bound to event {}".format(event_type))
 		
-		self.callbacks[event_type].append(callback)
+		index = callbacks.index(callback)
+		handlers = self._handlers[event_type]
 		
+		if len(callbacks) == 1:
+			del self._callbacks[event_type]
+			del self._handlers[event_type]
+		else:
+			self._callbacks[event_type] = callbacks[:index] + callbacks[index + 1:]
+			self._handlers[event_type] = handlers[:index] + handlers[index + 1:]
+	
+	@property
+	def callbacks(self):
+		""" Event type -> tuple of the callbacks bound to it, in the order bound """
+		return dict(self._callbacks) if self._callbacks is not None else {}
+	
+	def has_listeners(self, event_type):
+		""" Whether anything is bound to event_type on the window """
+		return self._handlers is not None and event_type in self._handlers
+	
 	def trigger(self, event_type, *args):
-		if event_type in self.callbacks:
-			for callback in self.callbacks[event_type]:
-				
-				# Because methods bound to this object will implicitly
-				# recieve the 'self' reference when called, we customise
-				# the parameters as to omit the Window/self reference
-				# which we'd otherwise pass as the first parameter.
-				# This behaviour can be overidden by using the
-				# @explicit_window_reference decorator on the method
-				# which will mean the 'self' and window (even if it
-				# is 'self') references are passed as parameters.
-				if inspect.ismethod(callback):
-					if callback.im_self is self and not hasattr(callback, "require_explicit"):
-						callback(*args)
-					else:
-						callback(self, *args)
-				else:
-					callback(self, *args)
+		# Bindings are stored as tuples so callbacks are free to bind
+		# and unbind while the event is being dispatched.
+		if self._handlers is None:
+			return
+		
+		root = self._root
+		if root is not None and root.profiler is not None:
+			root.profiler.trigger(self, self._handlers.get(event_type, ()), args)
+			return
+		
+		for handler in self._handlers.get(event_type, ()):
+			handler(*args)
 
 class RootWindow(Window):
 	
+	# Limit on how many times RECONFIGURE callbacks may cause further
+	# RECONFIGUREs when a batch is flushed, to catch cyclic layouts.
+	max_batch_rounds = 100
+	
 	def __init__(self):
 		
 		self.debug_draw = False
+		
+		# A pygame.gui.instrument.Profiler to record where each frame's
+		# time is spent, if any. Costs next to nothing when None.
+		self.profiler = None
+		
 		self._focus = None # Which window has keyboard focus
 		
 		self._previous_mouse_pos = pygame.mouse.get_pos()
 		self._mousedown_win = None
 		
+		# When enabled process_events() handles a run of consecutive
+		# MOUSEMOTION events as a single move to where the last one
+		# ends, counting those it skipped in motion_events_merged.
+		# Windows the pointer passes over within a run aren't hovered.
+		self.coalesce_motion = False
+		self.motion_events_merged = 0
+		
+		# When enabled draw() only repaints the areas of the screen
+		# that have changed since the previous call. Areas windows have
+		# moved away from are cleared to the root's background, or to
+		# dirty_rects_clear if it has none, so nothing is left behind.
+		self.dirty_rects = False
+		self.dirty_rects_clear = (0, 0, 0)
+		self._damage = [] # Rects vacated by windows since the last draw
+		self._damaged_windows = set() # Windows to repaint in full
+		
+		# When enabled draw() doesn't paint windows that would be
+		# hidden by opaque windows above them or that are outside what
+		# is being drawn, counting those painted and skipped in
+		# paint_counts.
+		self.culling = True
+		self.paint_counts = PaintCounts(0, 0, 0)
+		self.occlusion_cell_size = 64
+		
+		# A pygame.gui.text.RenderPool for Labels to render their text
+		# with in the background, if any. Until their text is ready
+		# they keep showing what they showed before.
+		self.render_pool = None
+		
+		# Callbacks scheduled to be called by step() and run()
+		self.timers = pygame.gui.loop.Scheduler()
+		self.stopped = False
+		
+		self._hit_index = pygame.gui.spatial.GridIndex()
+		
+		# Nesting depth of batch() and the side effects it is holding back
+		self._batch_depth = 0
+		self._batched_redraw = set()
+		self._batched_reconfigure = collections.OrderedDict()
+		
+		# Every window attached to the root in paint order, and the
+		# orders derived from it, kept between frames. The paint and
+		# composited orders are patched as windows are added, removed
+		# and restacked; the rest are rebuilt when next needed.
+		self._order = []
+		self._order_ranks = [] # Rank of each window in _order
+		self._paint_rank = {} # Window -> rank, which increases in paint order
+		self._composited_order = []
+		self._composited_ranks = []
+		self._hit_order = None
+		self._leaves = None
+		self._clip_cache = None # Parent -> clip rect of its children, while drawing
+		
 		Window.__init__(self, None,
 							width=pygame.display.get_surface().get_width(),
 							height=pygame.display.get_surface().get_height(),
@@ -313,7 +955,231 @@ class RootWindow(Window):
 						)
 		
 		self.surface = pygame.display.get_surface()
+		self._set_root(self)
+	
+	def __setattr__(self, attr, value):
+		# The root window has no contents of its own so, unlike other
+		# windows, writing its attributes only calls for a repaint when
+		# its background or geometry changes.
+		object.__setattr__(self, attr, value)
+		if attr == "background" and self._root is not None:
+			self._damaged_windows.add(self)
+		if attr in self._geometry_attrs:
+			self._reconfigure()
+	
+	@contextlib.contextmanager
+	def batch(self):
+		"""
+			Context manager which holds back the side effects of
+			changing window attributes until it exits. Redraws are
+			marked once per window and RECONFIGURE is triggered once
+			per window however many of its attributes were written,
+			rather than after each write. Callbacks run on exit are
+			batched too, so changes they make are folded into a
+			further round instead of cascading. Batches can be nested;
+			everything is released when the outermost one exits.
+			
+			Geometry is still invalidated as attributes are written, so
+			layout read within the batch is accurate and is calculated
+			afresh once afterwards.
+		"""
+		self._batch_depth += 1
+		try:
+			yield self
+		finally:
+			self._batch_depth -= 1
+			if self._batch_depth == 0:
+				self._flush_batch()
+	
+	def _defer_reconfigure(self, window):
+		self._batched_reconfigure[window] = None
+	
+	def _flush_batch(self):
+		
+		self._batch_depth += 1
+		try:
+			rounds = 0
+			while self._batched_reconfigure:
+				rounds += 1
+				if rounds > self.max_batch_rounds:
+					self._batched_reconfigure = collections.OrderedDict()
+					raise RuntimeError("RECONFIGURE callbacks did not settle "
+							"after {} rounds".format(self.max_batch_rounds))
+				
+				windows = self._batched_reconfigure
+				self._batched_reconfigure = collections.OrderedDict()
+				for window in windows:
+					if window._root is self:
+						window.trigger(Window.RECONFIGURE)
+		finally:
+			self._batch_depth -= 1
+			
+			for window in self._batched_redraw:
+				object.__setattr__(window, "redraw", True)
+				self._damaged_windows.add(window)
+			self._batched_redraw = set()
+	
+	def _index_of(self, window):
+		""" The GridIndex the window is hit-tested with """
+		
+		if window._viewport is not None:
+			return window._viewport._hit_index
+		return self._hit_index
+	
+	def _geometry_discarded(self, window):
+		if window._viewport is None:
+			self._damage.append(window._geometry.rect)
+		else:
+			# Where the window was on screen isn't known without laying
+			# out the viewport again, so the viewport is repainted
+			self._damaged_windows.add(window._viewport)
+		self._damaged_windows.add(window)
+		if window is not self:
+			self._index_of(window).invalidate(window)
+	
+	def _window_attached(self, window):
+		self._damaged_windows.add(window)
+		if window is not self:
+			self._index_of(window).invalidate(window)
+	
+	def _window_detached(self, window):
+		self._index_of(window).remove(window)
+	
+	def _subtree_attached(self, window):
+		""" Adds a window, which has just joined its siblings, and its descendants to the paint order """
+		
+		order = self._order
+		if order is not None:
+			# The window goes after its sibling below, and all of that
+			# sibling's descendants, or straight after its parent
+			previous = window._below
+			if previous is None:
+				previous = window.parent
+			else:
+				while previous.children:
+					previous = previous.children[-1]
+			
+			ranks = self._order_ranks
+			low = self._paint_rank[previous] if previous is not self else -1
+			start = bisect.bisect_right(ranks, low)
+			added = [window] + _pre_order(window)
+			
+			if start == len(order):
+				# Windows are mostly added on top of everything else, as
+				# when a tree is built or a popup opened
+				step = 1
+				added_ranks = range(int(low) + 1, int(low) + 1 + len(added))
+			else:
+				# Ranks only need to increase, so the windows are given
+				# ranks in between those of their neighbours
+				step = (ranks[start] - low) / float(len(added) + 1)
+				added_ranks = [low + step * (index + 1) for index in xrange(len(added))]
+			
+			if step < 1e-6:
+				# Out of room between the neighbours; start afresh
+				self._order = self._order_ranks = self._paint_rank = None
+				self._compositing_changed()
+			else:
+				order[start:start] = added
+				ranks[start:start] = added_ranks
+				self._paint_rank.update(itertools.izip(added, added_ranks))
+				
+				if self._composited_order is not None and not self._composited_within(window):
+					added = [window]
+					if not window.retained and not window.scrollable:
+						window._composited_paint_order(added)
+					start = bisect.bisect_left(self._composited_ranks, self._paint_rank[window])
+					self._composited_order[start:start] = added
+					self._composited_ranks[start:start] = [self._paint_rank[added_window]
+									for added_window in added]
+		
+		self._order_changed()
+	
+	def _subtree_detached(self, window):
+		""" Takes a window, which is about to leave its siblings, and its descendants out of the paint order """
+		
+		order = self._order
+		if order is not None:
+			start = bisect.bisect_left(self._order_ranks, self._paint_rank[window])
+			end = start + 1 + len(_pre_order(window))
+			
+			if self._composited_order is not None:
+				ranks = self._composited_ranks
+				first = bisect.bisect_left(ranks, self._order_ranks[start])
+				last = bisect.bisect_right(ranks, self._order_ranks[end - 1])
+				del self._composited_order[first:last]
+				del ranks[first:last]
+			
+			for removed in order[start:end]:
+				del self._paint_rank[removed]
+			del order[start:end]
+			del self._order_ranks[start:end]
+		
+		self._order_changed()
+	
+	def _order_changed(self):
+		""" Drops the orders derived from the paint order, to be rebuilt when next needed """
 		
+		self._hit_order = None
+		self._leaves = None
+	
+	def _compositing_changed(self):
+		self._composited_order = None
+		self._composited_ranks = None
+	
+	def _composited_within(self, window):
+		""" Whether the window is composited along with one of its ancestors """
+		
+		ancestor = window.parent
+		while ancestor is not None:
+			if ancestor.retained or ancestor.scrollable:
+				return True
+			ancestor = ancestor.parent
+		return False
+	
+	def _ordered(self):
+		if self._order is None:
+			self._order = _pre_order(self)
+			self._order_ranks = range(len(self._order))
+			self._paint_rank = dict(itertools.izip(self._order, self._order_ranks))
+		return self._order
+	
+	def paint_order(self):
+		return list(self._ordered())
+	
+	def hit_order(self):
+		"""
+			Returns the windows attached to the root top-most first, the
+			order they are hit-tested in. The list is shared, so treat
+			it as read-only.
+		"""
+		if self._hit_order is None:
+			self._hit_order = self._ordered()[::-1]
+		return self._hit_order
+	
+	@property
+	def leaves(self):
+		if self._leaves is None:
+			self._leaves = [window for window in self._ordered() if not window.children]
+		return iter(self._leaves)
+	
+	def _composited_paint_order(self):
+		if self._composited_order is None:
+			hidden = set() # Windows composited along with an ancestor
+			composited = []
+			
+			for window in self._ordered():
+				parent = window.parent
+				if parent in hidden or parent.retained or parent.scrollable:
+					hidden.add(window)
+				else:
+					composited.append(window)
+			
+			self._composited_order = composited
+			self._composited_ranks = [self._paint_rank[window] for window in composited]
+		
+		return self._composited_order
+	
 	@property
 	def focus(self):
 		return self._focus
@@ -328,35 +1194,28 @@ class RootWindow(Window):
 		if self._focus is not None:
 			self._focus.trigger(Window.FOCUS)
 		
-	@property
-	def requested_width(self):
+	def _calculate_geometry(self):
+		width = self._calculate_requested_width()
+		height = self._calculate_requested_height()
+		
+		return Geometry(self.x, self.y, width, height,
+					self._style.padding + self._style.border_width,
+					self.x, self.y, width, height)
+	
+	def _calculate_requested_width(self):
 		return int(self.width)
 	
-	@property
-	def requested_height(self):
+	def _calculate_requested_height(self):
 		return int(self.height)
 	
-	@property
-	def actual_height(self):
-		return self.requested_height
-	
-	@property
-	def actual_width(self):
-		return self.requested_width
-	
-	@property
-	def actual_x(self):
-		return self.x
-	
-	@property
-	def actual_y(self):
-		return self.y
-	
 	def process_events(self, events=None):
 		
 		if events is None:
 			events = pygame.event.get()
 		
+		if self.coalesce_motion:
+			events = self._coalesce_motion(events)
+		
 		for event in events:
 		
 			if self.focus is not None:
@@ -374,13 +1233,23 @@ class RootWindow(Window):
 				current_pos = event.pos
 				previous_pos = self._previous_mouse_pos
 				
-				for window in self.decendants:
-					
+				previous = set(self._windows_under(previous_pos))
+				current = set(self._windows_under(current_pos))
+				
+				leaving = [window for window in previous - current
+								if window.has_listeners(Window.MOUSEOUT)]
+				entering = [window for window in current - previous
+								if window.has_listeners(Window.MOUSEOVER)]
+				
+				for window in self._in_paint_order(leaving):
+					try:
+						window.trigger(Window.MOUSEOUT)
+					except NotImplementedError:
+						pass
+				
+				for window in self._in_paint_order(entering):
 					try:
-						if not window.rect.collidepoint(previous_pos) and window.rect.collidepoint(event.pos):
-							window.trigger(Window.MOUSEOVER)
-						elif window.rect.collidepoint(previous_pos) and not window.rect.collidepoint(event.pos):
-							window.trigger(Window.MOUSEOUT)
+						window.trigger(Window.MOUSEOVER)
 					except NotImplementedError:
 						pass
 					
@@ -388,102 +1257,604 @@ class RootWindow(Window):
 			
 			elif event.type == pygame.MOUSEBUTTONDOWN:
 				
-				for window in self.decendants:
-					if window.rect.collidepoint(event.pos):
-						window.trigger(Window.MOUSEDOWN)
-						
-						# Top-most window should receive the click event
-						# due to the way Window.decendants returns windows
-						if event.button == 1:
-							self._mousedown_win = window
+				windows = self.windows_at(event.pos)
+				for window in windows:
+					window.trigger(Window.MOUSEDOWN)
+				
+				# The mouse wheel scrolls the top-most scrollable window
+				if event.button in (4, 5):
+					for window in reversed(windows):
+						if window.scrollable:
+							window.trigger(ScrollableWindow.SCROLLUP if event.button == 4
+											else ScrollableWindow.SCROLLDOWN)
+							break
+				
+				# Top-most window should receive the click event
+				if event.button == 1 and windows:
+					self._mousedown_win = windows[-1]
 						
 			elif event.type == pygame.MOUSEBUTTONUP:
 				
-				for window in self.decendants:
-					if window.rect.collidepoint(event.pos):
-						window.trigger(Window.MOUSEUP)
-						
-						if event.button == 1 and window is self._mousedown_win:
-							window.trigger(Window.CLICK)
+				for window in self.windows_at(event.pos):
+					window.trigger(Window.MOUSEUP)
+					
+					if event.button == 1 and window is self._mousedown_win:
+						window.trigger(Window.CLICK)
+	
+	def _coalesce_motion(self, events):
+		"""
+			Returns events without the MOUSEMOTION events that are
+			directly followed by another, so the windows under the
+			pointer are only looked up once per run. Hovering is worked
+			out from where the pointer ends up, so windows it only
+			passed over during the run don't get MOUSEOVER or MOUSEOUT.
+		"""
+		coalesced = []
+		merged = 0
+		
+		for event in events:
+			if (event.type == pygame.MOUSEMOTION
+					and coalesced and coalesced[-1].type == pygame.MOUSEMOTION):
+				coalesced[-1] = event
+				merged += 1
+			else:
+				coalesced.append(event)
+		
+		self.motion_events_merged = merged
+		return coalesced
 	
-	def draw_window_background(self, window):
-		if window.background is not None:
-			pygame.draw.rect(self.surface, window.background, window.rect)
+	def _in_paint_order(self, windows):
+		self._ordered()
+		return sorted(windows, key=self._paint_rank.__getitem__)
 	
-	def draw_window_border(self, window):
-
-		if window.border_width < 1:
+	def _windows_under(self, pos, index=None):
+		"""
+			Returns an unordered list of the windows under pos, looking
+			within the viewports of scrollable windows at their
+			scrolled contents.
+		"""
+		if index is None:
+			index = self._hit_index
+		
+		windows = index.query(pos)
+		for window in list(windows):
+			if window.scrollable and window.geometry.content_rect.collidepoint(pos):
+				windows.extend(self._windows_under(
+								(pos[0] + window.scroll_x, pos[1] + window.scroll_y),
+								window._hit_index))
+		
+		return windows
+	
+	def windows_at(self, pos):
+		""" Returns the windows under pos, bottom-most first """
+		return self._in_paint_order(self._windows_under(pos))
+	
+	def window_at(self, pos):
+		""" Returns the top-most window under pos, or None if there isn't one """
+		windows = self.windows_at(pos)
+		return windows[-1] if windows else None
+	
+	def draw_window_background(self, window, surface=None, rect=None):
+		if surface is None:
+			surface = self.surface
+		if rect is None:
+			rect = window.geometry.rect
+		
+		# Styles are read from the shared Style directly while drawing
+		# as it saves going through each attribute's property
+		style = window._style
+		if style.skin is not None:
+			style.skin.draw(surface, rect)
+		elif style.background is not None:
+			# fill() ignores a negative left or top rather than clipping
+			# it, so windows off the top or left of the surface would
+			# spill past their far edge without clipping first
+			surface.fill(style.background, rect.clip(surface.get_clip()))
+	
+	def draw_window_border(self, window, surface=None, rect=None):
+		
+		style = window._style
+		if style.skin is not None or style.border_width < 1:
 			return
-			
-		if window.border_style == Window.BORDER_STYLE_SOLID:
-			pygame.draw.rect(self.surface, window.border_colour, window.rect, window.border_width)
-			
-		elif window.border_style == Window.BORDER_STYLE_OUTSET:
-
-			lolight = window.border_colour
-			hilight = [sum(cs) / len(cs) for cs in zip(lolight, (255, 255, 255), (255, 255, 255))]
-			
-			pygame.draw.line(self.surface, hilight, window.rect.topleft, window.rect.topright, window.border_width)
-			pygame.draw.line(self.surface, hilight, window.rect.topleft, window.rect.bottomleft, window.border_width)
-			pygame.draw.line(self.surface, lolight, window.rect.bottomleft, window.rect.bottomright, window.border_width)
-			pygame.draw.line(self.surface, lolight, window.rect.bottomright, window.rect.topright, window.border_width)
 		
-		elif window.border_style == Window.BORDER_STYLE_INSET:
-
-			lolight = window.border_colour
-			hilight = [sum(cs) / len(cs) for cs in zip(lolight, (255, 255, 255), (255, 255, 255))]
-			
-			pygame.draw.line(self.surface, lolight, window.rect.topleft, window.rect.topright, window.border_width)
-			pygame.draw.line(self.surface, lolight, window.rect.topleft, window.rect.bottomleft, window.border_width)
-			pygame.draw.line(self.surface, hilight, window.rect.bottomleft, window.rect.bottomright, window.border_width)
-			pygame.draw.line(self.surface, hilight, window.rect.bottomright, window.rect.topright, window.border_width)
+		if surface is None:
+			surface = self.surface
+		if rect is None:
+			rect = window.geometry.rect
 		
-	def draw_window_contents(self, window):
+		colours = border_colours(style.border_style, style.border_colour)
+		if colours is None:
+			return
+		top_left, bottom_right = colours
+		
+		# Edges are filled rather than drawn as lines so that the border
+		# never strays outside of the window's rect, and are clipped as
+		# fill() ignores a negative left or top
+		width = style.border_width
+		clip = surface.get_clip()
+		fill = surface.fill
+		fill(top_left, clip.clip(rect.left, rect.top, rect.width, width))
+		fill(top_left, clip.clip(rect.left, rect.top, width, rect.height))
+		fill(bottom_right, clip.clip(rect.left, rect.bottom - width, rect.width, width))
+		fill(bottom_right, clip.clip(rect.right - width, rect.top, width, rect.height))
+		
+	def draw_window_contents(self, window, surface=None, content_rect=None):
 		if window.redraw:
 			try:
-				window.draw()
-				window.redraw = False
+				if self.profiler is None:
+					window.draw()
+				else:
+					self.profiler.call(pygame.gui.instrument.DRAW, window, window.draw)
 			except NotImplementedError:
 				pass
+			object.__setattr__(window, "redraw", False)
 		
-		if window.content_rect.width > 0  and window.content_rect.height > 0:
-			if window.surface is not None:
-				if (window.surface.get_height() > window.content_rect.height
-					or window.surface.get_width() > window.content_rect.width):
-					# If the window's surface exceeds the allocated space
-					# clip it down to correct size. Does mean is surface_area
-					# specifies an area smaller than the content_rect it will
-					# be ignored.
-					surface = pygame.Surface(window.content_rect.size)
-					surface.blit(window.surface, (0, 0), window.surface_area)
-					self.surface.blit(surface, window.content_rect)
-				else:
-					self.surface.blit(window.surface, window.content_rect, window.surface_area)
+		if surface is None:
+			surface = self.surface
+		if content_rect is None:
+			content_rect = window.geometry.content_rect
+		
+		if self.profiler is None:
+			self._blit_contents(window, surface, content_rect)
+		else:
+			self.profiler.call(pygame.gui.instrument.BLIT, window,
+					self._blit_contents, window, surface, content_rect)
+	
+	def _blit_contents(self, window, surface, content_rect):
+		if (window.surface is None
+				or content_rect.width <= 0 or content_rect.height <= 0):
+			return
+		
+		# Only as much of the window's surface as fits within the
+		# content rect is copied, so oversized surfaces are cropped by
+		# the blit itself.
+		if window.surface_area is not None:
+			area = pygame.Rect(window.surface_area)
+		else:
+			area = window.surface.get_rect()
+		area.width = min(area.width, content_rect.width)
+		area.height = min(area.height, content_rect.height)
+		
+		surface.blit(window.surface, content_rect, area)
+	
+	def draw_window(self, window, surface=None, offset=None):
+		"""
+			Draws the window, but not its children, onto surface which
+			defaults to the root's own. If given, offset translates the
+			window's position on the screen to that on the surface.
+		"""
+		if surface is None:
+			surface = self.surface
+		
+		rect = window.geometry.rect
+		content_rect = window.geometry.content_rect
+		if offset is not None:
+			rect = rect.move(offset)
+			content_rect = content_rect.move(offset)
+		
+		try:
+			if self.profiler is None:
+				self.draw_window_background(window, surface, rect)
+				self.draw_window_contents(window, surface, content_rect)
+				self.draw_window_border(window, surface, rect)
+			else:
+				self.profiler.call(pygame.gui.instrument.BACKGROUND, window,
+						self.draw_window_background, window, surface, rect)
+				self.draw_window_contents(window, surface, content_rect)
+				self.profiler.call(pygame.gui.instrument.BORDER, window,
+						self.draw_window_border, window, surface, rect)
+		except:
+			print "Couldn't draw {}".format(window.__class__.__name__)
+			import pprint
+			pprint.pprint(window._attributes())
+			raise
+		
+		if self.debug_draw:
+			pygame.draw.rect(surface, (0, 255, 0), rect, 1)
+			pygame.draw.rect(surface, (0, 0, 255), content_rect, 1)
+	
+	def draw_retained(self, window, surface=None, offset=None):
+		"""
+			Draws a retained window along with its descendants onto
+			surface by blitting its cached composite, which is first
+			rendered if there isn't an up to date one.
+		"""
+		if surface is None:
+			surface = self.surface
+		
+		rect = window.geometry.rect
+		if rect.width <= 0 or rect.height <= 0:
+			return
+		
+		composite = window._retained_surface
+		if composite is None or composite.get_size() != rect.size:
+			composite = pygame.Surface(rect.size, pygame.SRCALPHA)
+			origin = (-rect.x, -rect.y)
 			
+			self.draw_window(window, composite, origin)
+			for descendant in window._composited_paint_order():
+				self._paint_window(descendant, composite, origin)
+			
+			object.__setattr__(window, "_retained_surface", composite)
+		
+		surface.blit(composite, rect.move(offset) if offset is not None else rect)
+	
+	def draw_scrollable(self, window, surface=None, offset=None):
+		"""
+			Draws a scrollable window along with those of its contents
+			within its viewport. The contents are rendered to a buffer
+			kept between draws; when only the scroll offset has changed
+			the buffer is shifted and just the strips scrolled into view
+			are rendered.
+		"""
+		if surface is None:
+			surface = self.surface
+		
+		self.draw_window(window, surface, offset)
+		
+		content_rect = window.geometry.content_rect
+		if content_rect.width <= 0 or content_rect.height <= 0:
+			return
+		
+		scroll = (window.scroll_x, window.scroll_y)
+		buffer = window._retained_surface
+		
+		if buffer is None or buffer.get_size() != content_rect.size:
+			buffer = pygame.Surface(content_rect.size, pygame.SRCALPHA)
+			exposed = [buffer.get_rect()]
+			object.__setattr__(window, "_retained_surface", buffer)
+		else:
+			exposed = _scroll_surface(buffer,
+							scroll[0] - window._buffer_scroll[0],
+							scroll[1] - window._buffer_scroll[1])
+		
+		for area in exposed:
+			self._paint_viewport(window, buffer, area)
+		object.__setattr__(window, "_buffer_scroll", scroll)
+		
+		surface.blit(buffer, content_rect.move(offset) if offset is not None else content_rect)
+	
+	def _paint_viewport(self, window, buffer, area):
+		"""
+			Paints the contents of a scrollable window which lie within
+			area of its buffer, leaving out everything else.
+		"""
+		content_rect = window.geometry.content_rect
+		origin = (-content_rect.x - window.scroll_x, -content_rect.y - window.scroll_y)
+		visible = area.move(-origin[0], -origin[1])
+		
+		buffer.set_clip(area)
+		buffer.fill((0, 0, 0, 0), area)
+		
+		for descendant in self._in_paint_order(window._hit_index.query_rect(visible)):
+			# Descendants of retained windows are painted along with them
+			ancestor = descendant.parent
+			while ancestor is not window and not ancestor.retained:
+				ancestor = ancestor.parent
+			
+			if ancestor is window:
+				self._paint_window(descendant, buffer, origin)
+		
+		buffer.set_clip(None)
+	
+	def _clip_of(self, window):
+		"""
+			Returns the rect, in layout coordinates, that the window is
+			confined to by the content rects of its ancestors, or None
+			if it isn't confined. Clipping stops at retained and
+			scrollable windows since the surfaces their contents are
+			composited onto are already confined to them.
+		"""
+		parent = window.parent
+		if parent is None or parent.scrollable:
+			return None
+		
+		cache = self._clip_cache
+		if cache is not None and parent in cache:
+			return cache[parent]
+		
+		clip = parent.geometry.content_rect
+		if not parent.retained:
+			outer = self._clip_of(parent)
+			if outer is not None:
+				clip = clip.clip(outer)
+		
+		if cache is not None:
+			cache[parent] = clip
+		return clip
+	
+	def _paint_window(self, window, surface=None, offset=None):
+		""" Paints window, clipped to its ancestors, with whichever method suits it """
+		
+		if surface is None:
+			surface = self.surface
+		
+		clip = self._clip_of(window)
+		if clip is not None:
+			if offset is not None:
+				clip = clip.move(offset)
+			previous = surface.get_clip()
+			clip = clip.clip(previous)
+			if clip.width <= 0 or clip.height <= 0:
+				return
+			surface.set_clip(clip)
+		
+		if window.scrollable:
+			self.draw_scrollable(window, surface, offset)
+		elif window.retained:
+			self.draw_retained(window, surface, offset)
+		else:
+			self.draw_window(window, surface, offset)
+		
+		if clip is not None:
+			surface.set_clip(previous)
+	
+	def _cull(self, windows, visible):
+		"""
+			Returns those of windows, in paint order, which can be seen
+			within the visible rects. Windows are left out if they lie
+			outside them, or outside the content rects of their
+			ancestors, or are entirely covered by an opaque window which
+			is painted after them.
+		"""
+		size = self.occlusion_cell_size
+		occluders = {} # (column, row) -> rects of opaque windows over that cell
+		painted = []
+		occluded = offscreen = 0
+		
+		# Working down from the top, windows above are known by the
+		# time each window is reached
+		for window in reversed(windows):
+			rect = window.geometry.rect
+			if rect.collidelist(visible) == -1:
+				offscreen += 1
+				continue
+			
+			clip = self._clip_of(window)
+			if clip is not None:
+				rect = rect.clip(clip)
+				if rect.width <= 0 or rect.height <= 0 or rect.collidelist(visible) == -1:
+					offscreen += 1
+					continue
+			
+			# A covering window must overlap the window's top-left
+			# corner, so only those over its cell need checking
+			cell = (rect.left // size, rect.top // size)
+			for occluder in occluders.get(cell, ()):
+				if occluder.contains(rect):
+					break
+			else:
+				painted.append(window)
+				if window.opaque:
+					for column in xrange(rect.left // size, (rect.right - 1) // size + 1):
+						for row in xrange(rect.top // size, (rect.bottom - 1) // size + 1):
+							occluders.setdefault((column, row), []).append(rect)
+				continue
+			
+			occluded += 1
+		
+		painted.reverse()
+		self.paint_counts = PaintCounts(len(painted), occluded, offscreen)
+		return painted
+	
+	def _collect_damage(self):
+		""" Returns non-overlapping rects covering everything that changed since the last draw """
+		
+		rects = self._damage
+		for window in self._damaged_windows:
+			# Windows within damaged viewports are covered by them
+			if window._root is self and window._viewport not in self._damaged_windows:
+				rects.append(window._screen_rect())
+		
+		screen = self.geometry.rect
+		return merge_rects([rect.clip(screen) for rect in rects])
+		
 	def draw(self):
+		"""
+			Paints the window tree onto the root surface and returns a
+			list of the rects that were updated, which can be passed
+			on to pygame.display.update(). If dirty_rects is enabled
+			only windows that overlap areas that have changed since
+			the previous draw are repainted, clipped to those areas.
+			
+			If the profiler's overlay is enabled it is drawn on top and
+			the area it covers is repainted on the following draw.
+		"""
+		profiler = self.profiler
+		if profiler is not None:
+			started = profiler.clock()
 		
-		for window in self.paint_order():
-			try:
-				self.draw_window_background(window)
-				self.draw_window_contents(window)
-				self.draw_window_border(window)
-			except:
-				print "Couldn't draw {}".format(window.__class__.__name__)
-				import pprint
-				pprint.pprint(window.__dict__)
-				raise
+		if self.render_pool is not None:
+			for window in self.render_pool.install():
+				if window._root is self:
+					object.__setattr__(window, "redraw", True)
+					self._damaged_windows.add(window)
+		
+		for window in self._damaged_windows:
+			window._discard_retained_surfaces()
+		
+		# Clip rects are shared between siblings for the duration of
+		# the draw
+		self._clip_cache = {}
+		
+		if self.dirty_rects:
+			damage = self._collect_damage()
+		else:
+			damage = [pygame.Rect(self.geometry.rect)]
+		
+		clear = self.background
+		if clear is None and self.dirty_rects:
+			clear = self.dirty_rects_clear
+		if clear is not None:
+			for rect in damage:
+				self.surface.fill(clear, rect)
+		
+		# Windows may be added while drawing, so a copy is painted from
+		windows = list(self._composited_paint_order())
+		if self.culling:
+			windows = self._cull(windows, damage)
+		else:
+			self.paint_counts = PaintCounts(len(windows), 0, 0)
+		
+		if self.dirty_rects:
+			for window in windows:
+				for index in window.geometry.rect.collidelistall(damage):
+					self.surface.set_clip(damage[index])
+					self._paint_window(window)
+			self.surface.set_clip(None)
+		else:
+			for window in windows:
+				self._paint_window(window)
+		
+		self._clip_cache = None
+		
+		# Windows that were drawn will have marked themselves as damaged
+		# while updating their surfaces, so only reset once painted.
+		self._damage = []
+		self._damaged_windows = set()
+		
+		if profiler is not None:
+			profiler.current.paint_counts = self.paint_counts
+			profiler.end_frame(profiler.clock() - started)
+			
+			if profiler.overlay:
+				overlay = profiler.draw_overlay(self.surface)
+				damage = merge_rects(damage + [overlay])
+				self._damage.append(overlay)
+		
+		return damage
+	
+	@property
+	def needs_draw(self):
+		""" Whether any window has changed since the last draw """
+		return bool(self._damage or self._damaged_windows)
+	
+	@property
+	def idle(self):
+		""" Whether nothing needs drawing until an event arrives or a timer is due """
+		
+		return not (self.needs_draw
+					or (self.render_pool is not None and len(self.render_pool)))
+	
+	def schedule(self, delay, callback, repeat=False):
+		"""
+			Calls callback once delay seconds have passed, and every
+			delay seconds after that if repeat is set, from step() or
+			run(). Returns a pygame.gui.loop.Timer which can be
+			cancelled.
+		"""
+		return self.timers.schedule(delay, callback, repeat)
+	
+	def stop(self):
+		""" Makes run() return once the current frame is finished """
+		self.stopped = True
+	
+	def step(self, events=None):
+		"""
+			Runs one frame without waiting: processes events, which
+			default to those queued, calls the timers that are due and,
+			only if a window has changed, draws and updates the
+			display. A QUIT event stops the root.
+			
+			Returns how many seconds can pass before step() needs
+			calling again, or None if nothing will change until an
+			event arrives. This lets the GUI be driven from another
+			event loop, such as by an asyncio task that sleeps for the
+			returned time, capped at a frame, between steps.
+		"""
+		if events is None:
+			events = pygame.event.get()
+		
+		if any(event.type == pygame.QUIT for event in events):
+			self.stop()
+		self.process_events(events)
+		self.timers.run_due()
+		
+		if self.needs_draw:
+			pygame.display.update(self.draw())
+		
+		if not self.idle:
+			return 0.0
+		
+		due = self.timers.next_due()
+		if due is None:
+			return None
+		return max(0.0, due - self.timers.clock())
+	
+	def run(self, fps=60):
+		"""
+			Runs frames with step() until stop() is called or a QUIT
+			event arrives, no more than fps a second. While no window
+			has changed the loop sleeps until an event arrives or a
+			timer is due rather than drawing.
+		"""
+		interval = 1.0 / fps if fps else 0.0
+		clock = self.timers.clock
+		self.stopped = False
+		waited = []
+		
+		while True:
+			started = clock()
+			timeout = self.step(waited + pygame.event.get())
+			if self.stopped:
+				break
 			
-			if self.debug_draw:
-				pygame.draw.rect(self.surface, (0, 255, 0), window.rect, 1)
-				pygame.draw.rect(self.surface, (0, 0, 255), window.content_rect, 1)
+			# Cap the frame rate, then if there is nothing to draw sleep
+			# until there is
+			remaining = started + interval - clock()
+			if remaining > 0:
+				pygame.time.wait(int(remaining * 1000))
+				if timeout is not None:
+					timeout -= remaining
+			
+			waited = []
+			if timeout is None or timeout > 0:
+				waited = self._wait_for_events(timeout)
+	
+	def _wait_for_events(self, timeout):
+		""" Waits up to timeout seconds, or for ever if None, for events and returns them """
+		
+		if timeout is None:
+			return [pygame.event.wait()]
+		
+		# pygame.event.wait() only takes a timeout from pygame 2, so
+		# before then the queue is polled
+		if pygame.version.vernum[0] >= 2:
+			milliseconds = int(timeout * 1000)
+			if milliseconds <= 0:
+				return []
+			event = pygame.event.wait(milliseconds)
+			return [event] if event.type != pygame.NOEVENT else []
+		
+		clock = self.timers.clock
+		deadline = clock() + timeout
+		while True:
+			events = pygame.event.get()
+			remaining = deadline - clock()
+			if events or remaining <= 0:
+				return events
+			pygame.time.wait(int(min(remaining, 0.01) * 1000) or 1)
 
 class SurfaceWindow(Window):
 	"""
 		Simple wrapper around PyGame's Surface. Takes a surface and
 		displays it within the window. Overides default width and
 		height values to be those of the source surface.
+		
+		The source is scaled to fit the window with the given
+		scale_quality; scaled copies are cached, so the source should
+		not be drawn on without calling pygame.gui.scaling.forget().
 	"""
 	
+	SCALE_NEAREST = pygame.gui.scaling.NEAREST
+	SCALE_SMOOTH = pygame.gui.scaling.SMOOTH
+	SCALE_MIPMAP = pygame.gui.scaling.MIPMAP
+	
+	default_scale_quality = SCALE_SMOOTH
+	
+	__slots__ = ("source_surface", "scale_quality")
+	_default_attrs = dict(Window._default_attrs, scale_quality="scale_quality")
+	
 	def __init__(self, parent, source, **kwargs):
 		Window.__init__(self, parent, **kwargs)
 		
@@ -495,12 +1866,102 @@ class SurfaceWindow(Window):
 			self.height = source.get_height()
 		
 	def draw(self):
-		self.surface = pygame.transform.smoothscale(self.source_surface, (self.actual_width, self.actual_height))
+		self.surface = pygame.gui.scaling.scale(self.source_surface,
+						(self.actual_width, self.actual_height), self.scale_quality)
 		
 class ScrollableWindow(Window):
+	"""
+		Window which acts as a viewport onto its children. Children are
+		laid out on a plane the size they need, rather than being
+		confined to the window, and the part of the plane in view is
+		chosen by the scroll_x and scroll_y offsets.
+		
+		Scrolling doesn't touch the children: the offsets are applied
+		when drawing and hit-testing, only children within the viewport
+		are drawn, and what is already in view is reused by shifting it
+		rather than being drawn again.
+	"""
 	
 	SCROLLUP = generate_event_id()
 	SCROLLDOWN = generate_event_id()
 	
+	scrollable = True
+	default_scroll_step = 20
+	
+	__slots__ = ("scroll_x", "scroll_y", "scroll_step", "_buffer_scroll", "_hit_index")
+	_default_attrs = dict(Window._default_attrs, scroll_step="scroll_step")
+	
 	def __init__(self, parent=None, **kwargs):
-		raise NotImplementedError
+		object.__setattr__(self, "scroll_x", 0)
+		object.__setattr__(self, "scroll_y", 0)
+		object.__setattr__(self, "_buffer_scroll", (0, 0))
+		object.__setattr__(self, "_hit_index", pygame.gui.spatial.GridIndex())
+		
+		Window.__init__(self, parent, **kwargs)
+		
+		self.bind(ScrollableWindow.SCROLLUP, self._on_scroll_up)
+		self.bind(ScrollableWindow.SCROLLDOWN, self._on_scroll_down)
+	
+	def __setattr__(self, attr, value):
+		if attr in ("scroll_x", "scroll_y"):
+			object.__setattr__(self, attr, value)
+			self._scrolled()
+		else:
+			Window.__setattr__(self, attr, value)
+	
+	def _scrolled(self):
+		# The contents themselves haven't changed so, rather than
+		# marking them damaged, only the viewport is repainted.
+		root = self._root
+		if root is not None:
+			root._damage.append(self._screen_rect(self.geometry.content_rect))
+		if self.parent is not None:
+			self.parent._discard_retained_surfaces()
+	
+	def _calculate_geometry(self):
+		geometry = Window._calculate_geometry(self)
+		
+		# Children aren't confined to the viewport
+		geometry.available_width = sys.maxint
+		geometry.available_height = sys.maxint
+		return geometry
+	
+	@property
+	def content_size(self):
+		"""
+			Size of the plane the children are laid out on: from the
+			top-left of the window's content area to the furthest edges
+			of its children, and at least the size of the viewport.
+		"""
+		content_rect = self.geometry.content_rect
+		width, height = content_rect.size
+		
+		for child in self.children:
+			rect = child.geometry.rect
+			width = max(width, rect.right - content_rect.x)
+			height = max(height, rect.bottom - content_rect.y)
+		
+		return width, height
+	
+	def scroll_to(self, x, y):
+		""" Scrolls so that (x, y) on the plane is at the top-left of the viewport """
+		
+		content_rect = self.geometry.content_rect
+		width, height = self.content_size
+		
+		x = int(max(0, min(x, width - content_rect.width)))
+		y = int(max(0, min(y, height - content_rect.height)))
+		
+		if x != self.scroll_x:
+			self.scroll_x = x
+		if y != self.scroll_y:
+			self.scroll_y = y
+	
+	def scroll_by(self, dx, dy):
+		self.scroll_to(self.scroll_x + dx, self.scroll_y + dy)
+	
+	def _on_scroll_up(self):
+		self.scroll_by(0, -self.scroll_step)
+	
+	def _on_scroll_down(self):
+		self.scroll_by(0, self.scroll_step)